@@ -0,0 +1,88 @@
+"""
+Caché en proceso de los metadatos de tarjeta (id, vencimiento, activo, dueño).
+
+Evita una consulta por pago en el endpoint de simulación. El saldo NO se
+guarda en la caché: las tarjetas devueltas lo tienen diferido y las
+operaciones de saldo se hacen con UPDATE condicionales (ver
+api/transaction/services.py), que son la comprobación autoritativa.
+
+Cada worker tiene su propia caché; el TTL acota cuánto tarda un worker en ver
+un cambio hecho por otro.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Card
+
+CACHED_FIELDS = ['id', 'numero_tarjeta', 'fecha_vencimiento', 'activo', 'user_id']
+
+
+class CardCache:
+    """LRU acotada con TTL, indexada por número de tarjeta"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, numero_tarjeta):
+        values = (
+            Card.objects
+            .filter(numero_tarjeta=numero_tarjeta)
+            .values_list(*CACHED_FIELDS)
+            .first()
+        )
+        if values is None:
+            raise Card.DoesNotExist(f"Tarjeta {numero_tarjeta} no encontrada")
+        return values
+
+    def get(self, numero_tarjeta):
+        """
+        Devuelve una instancia nueva de Card (con `saldo` diferido).
+        Lanza Card.DoesNotExist si la tarjeta no existe; los fallos no se cachean.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(numero_tarjeta)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(numero_tarjeta)
+                values = entry[1]
+            else:
+                values = None
+
+        if values is None:
+            values = self._load(numero_tarjeta)
+            with self._lock:
+                self._entries[numero_tarjeta] = (now + self.ttl, values)
+                self._entries.move_to_end(numero_tarjeta)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        # Instancia por llamada: los llamadores pueden modificarla sin afectar a otros hilos
+        return Card.from_db('default', CACHED_FIELDS, values)
+
+    def invalidate(self, numero_tarjeta):
+        with self._lock:
+            self._entries.pop(numero_tarjeta, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+card_cache = CardCache(
+    maxsize=settings.CARD_CACHE_SIZE,
+    ttl=settings.CARD_CACHE_TTL,
+)
+
+
+def get_card_by_number(numero_tarjeta):
+    return card_cache.get(numero_tarjeta)
+
+
+def invalidate_card(card):
+    card_cache.invalidate(card.numero_tarjeta)
@@ -0,0 +1,43 @@
+"""
+Desactivación de tarjetas vencidas.
+
+El comando `expire_cards` recorre, con el índice (activo, fecha_vencimiento),
+las tarjetas activas cuya fecha de vencimiento ya pasó y las marca
+activo=False en lotes con UPDATE condicionales, cada lote en su propia
+transacción para no retener el bloqueo de escritura.
+
+Los workers ven el cambio cuando caduca su entrada en la caché de tarjetas
+(CARD_CACHE_TTL); el cargo en sí ya exige activo=True en su UPDATE, y
+validate_card_for_payment sigue rechazando tarjetas vencidas entre barridos.
+"""
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Card
+
+
+def expire_batch(now, batch_size):
+    """Desactiva un lote de tarjetas vencidas antes de `now`; devuelve cuántas"""
+    with db_transaction.atomic():
+        ids = list(
+            Card.objects
+            .filter(activo=True, fecha_vencimiento__lt=now)
+            .order_by('fecha_vencimiento')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        return Card.objects.filter(
+            id__in=ids, activo=True, fecha_vencimiento__lt=now
+        ).update(activo=False, updated_at=timezone.now())
+
+
+def deactivate_expired_cards(batch_size=1000):
+    """Desactiva todas las tarjetas vencidas; devuelve el total"""
+    now = timezone.now()
+    total = 0
+    while True:
+        expired = expire_batch(now, batch_size)
+        total += expired
+        if expired < batch_size:
+            return total
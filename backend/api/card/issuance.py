@@ -0,0 +1,79 @@
+"""
+Emisión masiva de tarjetas para campañas de alta.
+
+Por lotes: se eligen usuarios sin tarjeta (has_card=False y sin tarjeta
+activa), se sacan sus números del pool en una consulta, se crean las
+tarjetas con bulk_create y se marca has_card con un único UPDATE. Las reglas
+son las de generate_card: tarjeta activa, saldo inicial igual al balance
+del usuario y vencimiento a 4 años.
+"""
+from datetime import timedelta
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from api.users.models import User
+from .models import Card
+from .numbers import allocate_card_numbers
+
+CARD_VALIDITY = timedelta(days=365 * 4)
+MAX_RETRIES = 3
+
+
+class ConcurrentIssue(Exception):
+    """Otro proceso emitió tarjeta a algún usuario del lote"""
+
+
+def eligible_users(user_ids=None):
+    queryset = User.objects.filter(has_card=False).exclude(cards__activo=True)
+    if user_ids is not None:
+        queryset = queryset.filter(id__in=user_ids)
+    return queryset.order_by('id')
+
+
+def _issue_batch(user_ids, batch_size):
+    with db_transaction.atomic():
+        users = list(eligible_users(user_ids).values_list('id', 'balance')[:batch_size])
+        if not users:
+            return 0
+
+        ids = [user_id for user_id, _ in users]
+        now = timezone.now()
+        # El UPDATE condicional reserva a los usuarios antes de crear nada
+        if User.objects.filter(id__in=ids, has_card=False).update(has_card=True, updated_at=now) != len(ids):
+            raise ConcurrentIssue()
+
+        numbers = allocate_card_numbers(len(users))
+        Card.objects.bulk_create([
+            Card(
+                numero_tarjeta=numero,
+                saldo=int(balance),
+                activo=True,
+                user_id=user_id,
+                fecha_vencimiento=now + CARD_VALIDITY,
+            )
+            for (user_id, balance), numero in zip(users, numbers)
+        ])
+    return len(users)
+
+
+def issue_cards(user_ids=None, limit=None, batch_size=1000):
+    """
+    Emite una tarjeta a cada usuario elegible (todos, o solo los de
+    `user_ids`), como mucho `limit`. Devuelve cuántas tarjetas creó.
+    """
+    issued, retries = 0, 0
+    while limit is None or issued < limit:
+        size = batch_size if limit is None else min(batch_size, limit - issued)
+        try:
+            created = _issue_batch(user_ids, size)
+        except ConcurrentIssue:
+            retries += 1
+            if retries > MAX_RETRIES:
+                raise RuntimeError("Emisión concurrente con otro proceso; reintente")
+            continue
+
+        issued += created
+        if created < size:
+            break
+    return issued
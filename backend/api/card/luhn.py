@@ -0,0 +1,103 @@
+"""
+Luhn por lotes con NumPy.
+
+Valida números de tarjeta y calcula dígitos de control para listas enteras
+a la vez: los números de igual longitud se convierten en una matriz de
+dígitos y la suma Luhn se hace por columnas. La referencia de corrección son
+Card.validate_luhn y Card.calculate_luhn_digit (ver `manage.py bench_luhn`,
+que compara ambos resultados).
+
+NumPy es opcional; sin él se usan los métodos escalares de Card.
+"""
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional
+    np = None
+
+from .models import Card
+
+# Valor Luhn de un dígito duplicado: 2*d, restando 9 si pasa de 9
+_DOUBLED = [0, 2, 4, 6, 8, 1, 3, 5, 7, 9]
+
+
+def _by_length(numbers):
+    groups = defaultdict(list)
+    for index, number in enumerate(numbers):
+        groups[len(number)].append(index)
+    return groups
+
+
+def _digit_matrix(numbers):
+    """Lista de cadenas de igual longitud -> (matriz n x L de dígitos, filas válidas)"""
+    raw = np.frombuffer(''.join(numbers).encode('ascii', 'replace'), dtype=np.uint8)
+    digits = raw.reshape(len(numbers), -1).astype(np.int16) - ord('0')
+    valid = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    return np.where((digits >= 0) & (digits <= 9), digits, 0), valid
+
+
+def _luhn_sums(digits, double_last):
+    """Suma Luhn de cada fila; `double_last` indica si se duplica el último dígito"""
+    doubled = np.asarray(_DOUBLED, dtype=np.int16)
+    length = digits.shape[1]
+    # Posiciones duplicadas contando desde la derecha
+    start = length - 1 if double_last else length - 2
+    mask = np.zeros(length, dtype=bool)
+    if start >= 0:
+        mask[start::-2] = True
+    return np.where(mask, doubled[digits], digits).sum(axis=1)
+
+
+def _is_digits(number):
+    return number.isascii() and number.isdigit()
+
+
+def _scalar_valid(number):
+    return _is_digits(number) and Card.validate_luhn(number)
+
+
+def validate_luhn_batch(numbers):
+    """
+    Lista de bool: si cada número pasa la comprobación Luhn. Los números con
+    caracteres que no son dígitos (o vacíos) son inválidos.
+    """
+    numbers = [str(number) for number in numbers]
+    if np is None:
+        return [_scalar_valid(number) for number in numbers]
+
+    result = [False] * len(numbers)
+    for length, indexes in _by_length(numbers).items():
+        if not length:
+            continue
+        digits, valid = _digit_matrix([numbers[i] for i in indexes])
+        ok = valid & (_luhn_sums(digits, double_last=False) % 10 == 0)
+        for index, value in zip(indexes, ok.tolist()):
+            result[index] = value
+    return result
+
+
+def luhn_digits_batch(partials):
+    """
+    Lista con el dígito de control de cada número parcial. Lanza ValueError
+    si alguno está vacío o contiene algo que no sea un dígito.
+    """
+    partials = [str(partial) for partial in partials]
+    if np is None:
+        for partial in partials:
+            if not _is_digits(partial):
+                raise ValueError(f"Número inválido: {partial!r}")
+        return [Card.calculate_luhn_digit(partial) for partial in partials]
+
+    result = [0] * len(partials)
+    for length, indexes in _by_length(partials).items():
+        group = [partials[i] for i in indexes]
+        if not length:
+            raise ValueError("Número inválido: ''")
+        digits, valid = _digit_matrix(group)
+        if not valid.all():
+            raise ValueError(f"Número inválido: {group[int(np.argmin(valid))]!r}")
+        check = (10 - _luhn_sums(digits, double_last=True) % 10) % 10
+        for index, value in zip(indexes, check.tolist()):
+            result[index] = value
+    return result
@@ -0,0 +1,61 @@
+"""
+Compara Card.validate_luhn / Card.calculate_luhn_digit con la versión por
+lotes de api/card/luhn.py sobre N números aleatorios y verifica que ambas
+den exactamente el mismo resultado.
+
+    python manage.py bench_luhn --count 1000000
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.card.luhn import luhn_digits_batch, np, validate_luhn_batch
+from api.card.models import Card
+from api.card.numbers import CARD_BIN, RANDOM_DIGITS
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark de Luhn por lotes (NumPy) frente a los métodos escalares de Card"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        partials = [
+            f'{CARD_BIN}{rng.randrange(10 ** RANDOM_DIGITS):0{RANDOM_DIGITS}d}'
+            for _ in range(options['count'])
+        ]
+        # Dígito final al azar: aproximadamente uno de cada diez es válido
+        numbers = [partial + str(rng.randrange(10)) for partial in partials]
+
+        scalar_digits_time, scalar_digits = _timed(
+            lambda: [Card.calculate_luhn_digit(partial) for partial in partials]
+        )
+        batch_digits_time, batch_digits = _timed(lambda: luhn_digits_batch(partials))
+        scalar_valid_time, scalar_valid = _timed(lambda: [Card.validate_luhn(number) for number in numbers])
+        batch_valid_time, batch_valid = _timed(lambda: validate_luhn_batch(numbers))
+
+        if scalar_digits != batch_digits:
+            raise CommandError("luhn_digits_batch difiere de Card.calculate_luhn_digit")
+        if scalar_valid != batch_valid:
+            raise CommandError("validate_luhn_batch difiere de Card.validate_luhn")
+
+        self.stdout.write(f"Números: {options['count']}  (numpy: {'sí' if np is not None else 'no'})")
+        self.stdout.write(
+            f"Dígito de control: escalar {scalar_digits_time:.2f} s, lotes {batch_digits_time:.2f} s "
+            f"(x{scalar_digits_time / batch_digits_time:.1f})"
+        )
+        self.stdout.write(
+            f"Validación:        escalar {scalar_valid_time:.2f} s, lotes {batch_valid_time:.2f} s "
+            f"(x{scalar_valid_time / batch_valid_time:.1f})"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Resultados idénticos ({sum(batch_valid)} válidos)"))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from api.card.expiry import deactivate_expired_cards
+
+
+class Command(BaseCommand):
+    help = "Desactiva las tarjetas cuya fecha de vencimiento ya pasó"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Tarjetas por lote (default: 1000)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repetir cada N segundos (0 = ejecutar una vez)')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                expired = deactivate_expired_cards(batch_size=options['batch_size'])
+            except OperationalError as e:
+                # p. ej. "database is locked": se reintenta en la siguiente pasada
+                if not options['interval']:
+                    raise
+                self.stderr.write(f"Error de base de datos, se reintenta: {e}")
+            else:
+                if expired:
+                    self.stdout.write(f"Tarjetas desactivadas por vencimiento: {expired}")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
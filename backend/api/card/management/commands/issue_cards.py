@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.card.issuance import eligible_users, issue_cards
+
+
+class Command(BaseCommand):
+    help = "Emite tarjetas en lote a los usuarios sin tarjeta (has_card=False)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-ids', type=int, nargs='+',
+                            help='Solo estos usuarios (por defecto, todos los elegibles)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Máximo de tarjetas a emitir')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Usuarios por lote (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo contar los usuarios elegibles')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = eligible_users(options['user_ids']).count()
+            self.stdout.write(f"Usuarios elegibles: {count}")
+            return
+
+        try:
+            issued = issue_cards(
+                user_ids=options['user_ids'],
+                limit=options['limit'],
+                batch_size=options['batch_size'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Tarjetas emitidas: {issued}"))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from api.card.numbers import refill_pool
+
+
+class Command(BaseCommand):
+    help = "Rellena el pool de números de tarjeta pre-generados"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None,
+                            help='Tamaño objetivo del pool (default: CARD_POOL_SIZE)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repetir cada N segundos (0 = ejecutar una vez)')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                added = refill_pool(options['size'])
+            except OperationalError as e:
+                # p. ej. "database is locked": se reintenta en la siguiente pasada
+                if not options['interval']:
+                    raise
+                self.stderr.write(f"Error de base de datos, se reintenta: {e}")
+            else:
+                self.stdout.write(f"Números añadidos al pool: {added}")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
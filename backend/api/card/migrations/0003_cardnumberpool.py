@@ -0,0 +1,24 @@
+# Generated by Django 5.2.11 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0002_alter_card_numero_tarjeta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardNumberPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_tarjeta', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'card_number_pool',
+            },
+        ),
+    ]
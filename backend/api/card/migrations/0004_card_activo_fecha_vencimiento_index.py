@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0003_cardnumberpool'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['activo', 'fecha_vencimiento'], name='cards_activo_e95541_idx'),
+        ),
+    ]
@@ -1,5 +1,4 @@
 from django.db import models
-import random
 
 from api.models import BaseModel
 
@@ -23,6 +22,10 @@ class Card(BaseModel, models.Model):
     class Meta:
         db_table = 'cards'
         app_label = 'card'  
+        indexes = [
+            # Barrido de tarjetas vencidas (api/card/expiry.py)
+            models.Index(fields=['activo', 'fecha_vencimiento']),
+        ]
     
     def __str__(self):
         return f"Tarj: {self.numero_tarjeta} - Usuario: {self.user.full_name}"
@@ -68,27 +71,23 @@ class Card(BaseModel, models.Model):
     @classmethod
     def generate_card_number(cls):
         """
-        Genera un número de tarjeta único de 16 dígitos con BIN 465100
-        y validación Luhn
+        Devuelve un número de tarjeta único de 16 dígitos con BIN 465100
+        y validación Luhn, tomado del pool pre-generado (api/card/numbers.py)
         """
-        BIN = "465100"  # Bank Identification Number de CiensPay
-        
-        max_attempts = 1000
-        for _ in range(max_attempts):
-            # Generar 9 dígitos aleatorios (16 total - 6 BIN - 1 check digit)
-            random_digits = ''.join([str(random.randint(0, 9)) for _ in range(9)])
-            
-            # Combinar BIN + dígitos aleatorios
-            partial_number = BIN + random_digits
-            
-            # Calcular el dígito de verificación Luhn
-            check_digit = cls.calculate_luhn_digit(partial_number)
-            
-            # Número completo de 16 dígitos
-            full_number = partial_number + str(check_digit)
-            
-            # Verificar que sea único en la base de datos
-            if not cls.objects.filter(numero_tarjeta=full_number).exists():
-                return full_number
-        
-        raise Exception("No se pudo generar un número de tarjeta único después de múltiples intentos")
\ No newline at end of file
+        from .numbers import allocate_card_number
+        return allocate_card_number()
+
+class CardNumberPool(models.Model):
+    """
+    Números de tarjeta ya generados y comprobados como libres, listos para
+    asignar. Ver api/card/numbers.py y el comando `refill_card_pool`.
+    """
+    numero_tarjeta = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'card_number_pool'
+        app_label = 'card'
+
+    def __str__(self):
+        return self.numero_tarjeta
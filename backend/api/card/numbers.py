@@ -0,0 +1,91 @@
+"""
+Asignación de números de tarjeta desde un pool pre-generado.
+
+`refill_pool` genera candidatos por lotes (BIN + 9 dígitos aleatorios +
+dígito Luhn calculado con api/card/luhn.py), descarta con una sola consulta
+IN los que ya usa alguna tarjeta y guarda el resto en card_number_pool.
+Asignar números es un único DELETE ... RETURNING sobre el pool, así emitir
+una tarjeta cuesta una consulta aunque el espacio del BIN esté muy ocupado.
+El comando `refill_card_pool --interval` (servicio card-pool de
+docker-compose) lo mantiene lleno en segundo plano; si aun así se vacía, se
+rellena en el momento, con consultas de más.
+"""
+import random
+
+from django.conf import settings
+from django.db import connection
+
+from .luhn import luhn_digits_batch
+from .models import Card, CardNumberPool
+
+CARD_BIN = '465100'  # Bank Identification Number de CiensPay
+RANDOM_DIGITS = 9    # 16 dígitos - 6 del BIN - 1 de control
+MAX_CANDIDATES = 5000
+
+
+def _candidates(n):
+    """`n` números válidos distintos entre sí"""
+    numbers = set()
+    while len(numbers) < n:
+        partials = [
+            f'{CARD_BIN}{random.randrange(10 ** RANDOM_DIGITS):0{RANDOM_DIGITS}d}'
+            for _ in range(n - len(numbers))
+        ]
+        numbers.update(
+            partial + str(digit) for partial, digit in zip(partials, luhn_digits_batch(partials))
+        )
+    return numbers
+
+
+def refill_pool(size=None):
+    """Completa el pool hasta `size` números; devuelve cuántos añadió"""
+    size = settings.CARD_POOL_SIZE if size is None else size
+    initial = current = CardNumberPool.objects.count()
+
+    while current < size:
+        # Se piden el doble: parte de los candidatos puede estar ya en uso
+        candidates = _candidates(min(2 * (size - current), MAX_CANDIDATES))
+        taken = set(
+            Card.objects.filter(numero_tarjeta__in=candidates).values_list('numero_tarjeta', flat=True)
+        )
+        free = list(candidates - taken)[:size - current]
+        CardNumberPool.objects.bulk_create(
+            [CardNumberPool(numero_tarjeta=numero) for numero in free], ignore_conflicts=True
+        )
+
+        previous, current = current, CardNumberPool.objects.count()
+        if current == previous:
+            # No queda hueco libre que encontrar al azar
+            break
+
+    return current - initial
+
+
+def _take(count):
+    table = connection.ops.quote_name(CardNumberPool._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE id IN "
+            f"(SELECT id FROM {table} ORDER BY id LIMIT %s) RETURNING numero_tarjeta",
+            [count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def allocate_card_numbers(count):
+    """
+    Saca `count` números del pool con una consulta. Si no alcanza, rellena
+    el pool y vuelve a intentarlo; lanza RuntimeError si no hay números libres.
+    """
+    numbers = _take(count)
+    while len(numbers) < count:
+        refill_pool(max(settings.CARD_POOL_SIZE, count - len(numbers)))
+        more = _take(count - len(numbers))
+        if not more:
+            raise RuntimeError("No se pudo generar un número de tarjeta único")
+        numbers += more
+    return numbers
+
+
+def allocate_card_number():
+    return allocate_card_numbers(1)[0]
@@ -10,4 +10,12 @@ class CardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Card
         fields = ['id', 'numero_tarjeta', 'saldo', 'activo', 
-                  'fecha_vencimiento', 'user', 'transactions']
\ No newline at end of file
+                  'fecha_vencimiento', 'user', 'transactions']
+
+
+class CardSummarySerializer(serializers.ModelSerializer):
+    """Igual que CardSerializer pero sin anidar las transacciones"""
+    class Meta:
+        model = Card
+        fields = ['id', 'numero_tarjeta', 'saldo', 'activo', 
+                  'fecha_vencimiento', 'user']
@@ -2,6 +2,13 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.conf import settings
+from django.db import transaction as db_transaction
+from api.admin_views import IsAdmin
+from api.pagination import KeysetPagination
+from api.transaction.services import CIENSPAY_MERCHANT_CARD, fold_merchant_ledger
+from .cache import invalidate_card
+from .issuance import issue_cards
 from .models import Card
 from .serializers import CardSerializer, GenerateCardSerializer
 from api.users.models import User
@@ -94,16 +101,72 @@ def generate_card(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+def generate_cards_bulk(request):
+    """
+    Emite tarjetas en lote a los usuarios que aún no tienen (has_card=False)
+    
+    Body params:
+    - user_ids (opcional): lista de IDs; por defecto, todos los elegibles
+    - limit (opcional): máximo de tarjetas a emitir (default y tope: BULK_CARD_ISSUE_MAX)
+    """
+    user_ids = request.data.get('user_ids')
+    if user_ids is not None and (
+        not isinstance(user_ids, list) or not all(isinstance(i, int) for i in user_ids)
+    ):
+        return Response({
+            'success': False,
+            'message': 'user_ids debe ser una lista de enteros'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = int(request.data.get('limit', settings.BULK_CARD_ISSUE_MAX))
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'message': 'limit debe ser un entero'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 0), settings.BULK_CARD_ISSUE_MAX)
+    
+    try:
+        issued = issue_cards(user_ids=user_ids, limit=limit)
+    except RuntimeError as e:
+        return Response({
+            'success': False,
+            'message': f'Error al generar las tarjetas: {str(e)}'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    return Response({
+        'success': True,
+        'message': f'{issued} tarjetas generadas',
+        'issued': issued
+    }, status=status.HTTP_201_CREATED)
+
+
+# Columnas que usa CardSerializer; el resto de Card y User no se lee
+CARD_LIST_FIELDS = ['id', 'numero_tarjeta', 'saldo', 'activo', 'fecha_asignacion', 'fecha_vencimiento']
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_cards(request):
-    """Lista todas las tarjetas"""
-    cards = Card.objects.all().select_related('user')
+    """
+    Lista las tarjetas paginadas por cursor, por id ascendente
+    
+    Query params: cursor, page_size (default 50, máx. 200).
+    `count` es el número de tarjetas de la página.
+    """
+    queryset = Card.objects.select_related('user').only(*CARD_LIST_FIELDS, 'user__email')
+    paginator = KeysetPagination(ordering=('id',))
+    cards = paginator.paginate_queryset(queryset, request)
     serializer = CardSerializer(cards, many=True)
     return Response({
         'success': True,
-        'count': cards.count(),
-        'cards': serializer.data
+        'count': len(cards),
+        'cards': serializer.data,
+        'next': paginator.get_next_link(),
+        'next_cursor': paginator.next_cursor,
     })
 
 
@@ -111,20 +174,31 @@ def list_cards(request):
 @permission_classes([AllowAny])
 def get_user_cards(request, user_id):
     """Obtiene las tarjetas de un usuario específico"""
-    try:
-        user = User.objects.get(id=user_id)
-        cards = Card.objects.filter(user=user)
-        serializer = CardSerializer(cards, many=True)
-        return Response({
-            'success': True,
-            'count': cards.count(),
-            'cards': serializer.data
-        })
-    except User.DoesNotExist:
+    # Una sola consulta: el LEFT JOIN devuelve una fila aunque no tenga tarjetas
+    rows = list(
+        User.objects
+        .filter(id=user_id)
+        .order_by('cards__id')
+        .values_list('email', *(f'cards__{field}' for field in CARD_LIST_FIELDS))
+    )
+    if not rows:
         return Response({
             'success': False,
             'message': 'Usuario no encontrado'
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    user = User(id=user_id, email=rows[0][0])
+    cards = [
+        Card(user=user, **dict(zip(CARD_LIST_FIELDS, values)))
+        for _, *values in rows
+        if values[0] is not None
+    ]
+    serializer = CardSerializer(cards, many=True)
+    return Response({
+        'success': True,
+        'count': len(cards),
+        'cards': serializer.data
+    })
 
 
 @api_view(['PATCH'])
@@ -147,7 +221,8 @@ def toggle_card_status(request, card_id):
             new_status = not card.activo
         
         card.activo = new_status
-        card.save(update_fields=['activo'])
+        card.save(update_fields=['activo', 'updated_at'])
+        invalidate_card(card)
         
         return Response({
             'success': True,
@@ -197,8 +272,14 @@ def update_card_balance(request, card_id):
                 'message': 'El balance no puede ser negativo'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        card.saldo = new_balance
-        card.save(update_fields=['saldo'])
+        with db_transaction.atomic():
+            if card.numero_tarjeta == CIENSPAY_MERCHANT_CARD:
+                # Se consolidan antes los shards; si no, sus abonos se sumarían
+                # al saldo nuevo en la siguiente consolidación
+                fold_merchant_ledger()
+            card.saldo = new_balance
+            card.save(update_fields=['saldo', 'updated_at'])
+        invalidate_card(card)
         
         # También actualizamos el balance del usuario para mantener consistencia 
         # (si esa es la lógica deseada, sino comentar las siguientes 2 líneas)
@@ -0,0 +1,150 @@
+"""
+Paginación por cursor (keyset) compartida por los listados de la API.
+
+En lugar de OFFSET/COUNT se ordena por una clave única (p. ej.
+`-fecha_operacion, -id`) y el cursor guarda los valores de la última fila
+devuelta; la página siguiente es `WHERE clave < cursor ORDER BY clave LIMIT n`,
+que con el índice adecuado cuesta lo mismo en la página 1 que en la 1000.
+"""
+import base64
+import json
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class KeysetPagination(BasePagination):
+    """
+    `ordering` debe ser una clave única con todas las columnas en la misma
+    dirección (todas descendentes o todas ascendentes), terminando en `id`.
+    """
+    ordering = ('-fecha_operacion', '-id')
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+
+    # --- Cursor ---------------------------------------------------------
+
+    @property
+    def _fields(self):
+        return [f.lstrip('-') for f in self.ordering]
+
+    @property
+    def _descending(self):
+        return self.ordering[0].startswith('-')
+
+    def encode_cursor(self, row):
+        values = [self._value(row, f) for f in self._fields]
+        raw = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, model):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if len(values) != len(self._fields):
+                raise ValueError
+            return [model._meta.get_field(f).to_python(v) for f, v in zip(self._fields, values)]
+        except Exception:
+            raise NotFound('Cursor inválido')
+
+    def _after(self, values):
+        """Q de las filas estrictamente posteriores al cursor en el orden dado"""
+        lookup = 'lt' if self._descending else 'gt'
+        conditions = []
+        for i, field in enumerate(self._fields):
+            equal = {f: v for f, v in zip(self._fields[:i], values[:i])}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+        # La cota sobre el primer campo es redundante, pero sin ella el OR no
+        # da al índice un punto de partida y cada página lo recorre desde el
+        # principio
+        bound = Q(**{f'{self._fields[0]}__{lookup}e': values[0]})
+        return bound & reduce(lambda a, b: a | b, conditions)
+
+    # --- API de DRF -----------------------------------------------------
+
+    def get_page_size(self, request):
+        size = _to_int(request.query_params.get(self.page_size_query_param), self.page_size)
+        return min(max(size, 1), self.max_page_size)
+
+    def _value(self, row, field):
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    def _slice(self, queryset, after, limit):
+        queryset = queryset.order_by(*self.ordering)
+        if after is not None:
+            queryset = queryset.filter(self._after(after))
+        return list(queryset[:limit])
+
+    def _reaches(self, rows, limit, horizon):
+        """¿Puede haber filas del archivo en esta página?"""
+        if not self._descending or len(rows) < limit:
+            return True
+        return self._value(rows[-1], self._fields[0]) <= horizon
+
+    def paginate_queryset(self, queryset, request, view=None, archive=None):
+        """
+        `archive` es opcional: un par (horizonte, queryset) con filas más
+        antiguas guardadas en otra tabla con las mismas columnas, todas con el
+        primer campo del orden <= horizonte. Solo se consulta cuando la página
+        llega al horizonte, y sus filas se mezclan con las de `queryset`.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        after = self.decode_cursor(cursor, queryset.model) if cursor else None
+
+        # Una fila extra indica si hay página siguiente, sin COUNT(*)
+        rows = self._slice(queryset, after, page_size + 1)
+        if archive is not None and self._reaches(rows, page_size + 1, archive[0]):
+            rows += self._slice(archive[1], after, page_size + 1)
+            rows.sort(key=lambda row: [self._value(row, f) for f in self._fields],
+                      reverse=self._descending)
+            rows = rows[:page_size + 1]
+
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
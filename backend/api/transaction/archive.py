@@ -0,0 +1,83 @@
+"""
+Archivado en frío de transaction_history.
+
+El comando `archive_transactions` mueve por lotes a transaction_archive las
+transacciones con más de ARCHIVE_AFTER_DAYS días; cada lote se copia y se
+borra en la misma transacción. Así la tabla caliente y sus índices solo
+crecen con la actividad reciente.
+
+No se archivan filas que algún agregado incremental (rollups.ROLLUPS) aún no
+ha procesado ni filas enlazadas desde settlement_outbox.
+
+Las lecturas consultan el archivo solo cuando llegan a su horizonte (la
+fecha_operacion archivada más reciente): KeysetPagination mezcla las dos
+tablas al paginar y la exportación las mezcla por id.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .export import _parse_bound
+from .models import ArchivedTransaction, Transaction
+from .rollups import processed_until
+
+ARCHIVE_FIELDS = [
+    'id', 'created_at', 'updated_at', 'card_id', 'tipo', 'monto', 'saldo_anterior',
+    'saldo_posterior', 'fecha_operacion', 'descripcion', 'exitoso',
+]
+
+# Lo que KeysetPagination.paginate_queryset recibe como `archive`
+ArchiveSource = namedtuple('ArchiveSource', ['horizonte', 'queryset'])
+
+
+def archive_horizon():
+    """fecha_operacion más reciente del archivo; None si está vacío"""
+    return ArchivedTransaction.objects.aggregate(horizonte=Max('fecha_operacion'))['horizonte']
+
+
+def archive_source(build, desde=None):
+    """
+    ArchiveSource con `build(ArchivedTransaction.objects.all())` si una
+    consulta que empieza en `desde` (fecha en texto, como en
+    export.filter_transactions, o None) puede incluir filas archivadas;
+    None si basta con la tabla caliente.
+    """
+    horizon = archive_horizon()
+    if horizon is None or (desde and _parse_bound(desde) > horizon):
+        return None
+    return ArchiveSource(horizon, build(ArchivedTransaction.objects.all()))
+
+
+def archive_batch(cutoff, batch_size):
+    """Mueve al archivo un lote anterior a `cutoff`; devuelve cuántas filas movió"""
+    with db_transaction.atomic():
+        ids = list(
+            Transaction.objects
+            .filter(fecha_operacion__lt=cutoff, id__lte=processed_until(), settlements__isnull=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        rows = Transaction.objects.filter(id__in=ids).order_by().values(*ARCHIVE_FIELDS)
+        ArchivedTransaction.objects.bulk_create([ArchivedTransaction(**row) for row in rows])
+        Transaction.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_transactions(days=None, batch_size=1000):
+    """Archiva todo lo que tenga más de `days` días; devuelve el total movido"""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
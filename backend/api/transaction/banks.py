@@ -0,0 +1,218 @@
+"""
+Conectores HTTP hacia los bancos externos (grupo3 / grupo5) y hacia la
+propia API de CiensPay.
+
+Cada banco tiene un único conector por proceso con su pool de conexiones
+keep-alive, de modo que los pagos reutilizan la conexión TCP+TLS en vez de
+abrir una nueva por petición. Los timeouts de conexión y de lectura son
+independientes: un banco caído falla rápido en el connect y uno lento no
+retiene el worker más allá del timeout de lectura.
+
+El enrutado de pagos (resolve_bank / route_payment) es declarativo: por alias
+del identificador de banco o, en su defecto, por prefijo BIN de la tarjeta.
+"""
+import asyncio
+import threading
+import weakref
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+
+from .metrics import STAGE_BANK_CALL, timed_stage
+
+try:
+    import httpx
+except ImportError:  # El cliente async es opcional
+    httpx = None
+
+
+CIENSPAY = 'cienspay'
+CREDITBANK = 'creditbank'
+BANCOBSIDIANA = 'bancobsidiana'
+
+# Alias con los que el frontend identifica a cada banco
+BANK_ALIASES = {
+    'creditbank': CREDITBANK,
+    'grupo3': CREDITBANK,
+    'bancobsidiana': BANCOBSIDIANA,
+    'grupo5': BANCOBSIDIANA,
+    'cienspay': CIENSPAY,
+    '4651': CIENSPAY,
+    'grupo2': CIENSPAY,
+}
+
+
+class BankError(requests.exceptions.RequestException):
+    """Error de comunicación con un banco (también para el cliente async)"""
+
+
+class BankConnector:
+    """Cliente HTTP reutilizable para un banco concreto"""
+
+    def __init__(self, name, base_url, connect_timeout, read_timeout, pool_size):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Un AsyncClient queda ligado al event loop donde se creó: uno por
+        # loop, que se descarta con el loop en lugar de reemplazarse
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<BankConnector {self.name} {self.base_url}>"
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    # --- Cliente síncrono -------------------------------------------------
+
+    @timed_stage(STAGE_BANK_CALL)
+    def request(self, method, path, payload=None):
+        """Envía `payload` como JSON y devuelve la respuesta (sin raise_for_status)"""
+        return self.session.request(method, self.url(path), json=payload, timeout=self.timeout)
+
+    def post(self, path, payload=None):
+        return self.request('POST', path, payload)
+
+    def patch(self, path, payload=None):
+        return self.request('PATCH', path, payload)
+
+    # --- Cliente asíncrono (vistas ASGI) ----------------------------------
+
+    def _get_async_client(self):
+        if httpx is None:
+            raise ImproperlyConfigured("Instala 'httpx' para usar los conectores bancarios async")
+
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                )
+        return client
+
+    async def arequest(self, method, path, payload=None):
+        """Versión async de request(); los errores de red se lanzan como BankError"""
+        client = self._get_async_client()
+        try:
+            return await client.request(method, '/' + path.lstrip('/'), json=payload)
+        except httpx.HTTPError as e:
+            raise BankError(str(e)) from e
+
+    async def apost(self, path, payload=None):
+        return await self.arequest('POST', path, payload)
+
+    async def apatch(self, path, payload=None):
+        return await self.arequest('PATCH', path, payload)
+
+    async def aclose(self):
+        """Cierra el cliente del event loop actual"""
+        with self._async_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_connectors = {}
+_connectors_lock = threading.Lock()
+
+
+def get_connector(bank_identifier):
+    """
+    Devuelve el conector (compartido por proceso) del banco indicado.
+    Acepta cualquiera de los alias de BANK_ALIASES.
+    """
+    name = BANK_ALIASES.get(bank_identifier)
+    if name is None:
+        raise KeyError(f"Banco desconocido: {bank_identifier}")
+
+    connector = _connectors.get(name)
+    if connector is None:
+        with _connectors_lock:
+            connector = _connectors.get(name)
+            if connector is None:
+                connector = BankConnector(
+                    name,
+                    settings.BANK_BASE_URLS[name],
+                    connect_timeout=settings.BANK_CONNECT_TIMEOUT,
+                    read_timeout=settings.BANK_READ_TIMEOUT,
+                    pool_size=settings.BANK_POOL_SIZE,
+                )
+                _connectors[name] = connector
+    return connector
+
+
+class BinTrie:
+    """Trie de prefijos BIN: resuelve el banco de un número en O(len(número))"""
+
+    _BANK = object()  # clave del banco dentro de cada nodo
+
+    def __init__(self, prefixes=None):
+        self._root = {}
+        for bank, bins in (prefixes or {}).items():
+            for prefix in bins:
+                self.insert(prefix, bank)
+
+    def insert(self, prefix, bank):
+        node = self._root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        node[self._BANK] = bank
+
+    def match(self, card_number):
+        """Banco del prefijo más largo que coincide, o None"""
+        node = self._root
+        bank = None
+        for digit in card_number:
+            node = node.get(digit)
+            if node is None:
+                break
+            bank = node.get(self._BANK, bank)
+        return bank
+
+
+_bin_trie = None
+
+
+def resolve_bank(bank_identifier=None, card_number=None):
+    """
+    Nombre canónico del banco de un pago, o None si no se puede enrutar.
+
+    Primero se usa el identificador enviado por el frontend; si no se
+    reconoce, el prefijo BIN de la tarjeta (settings.BANK_BIN_PREFIXES).
+    """
+    global _bin_trie
+
+    bank = BANK_ALIASES.get(bank_identifier)
+    if bank is None and card_number:
+        if _bin_trie is None:
+            _bin_trie = BinTrie(settings.BANK_BIN_PREFIXES)
+        bank = _bin_trie.match(str(card_number).replace(' ', ''))
+    return bank
+
+
+def route_payment(bank_identifier=None, card_number=None):
+    """Conector del banco que debe procesar el pago, o None"""
+    bank = resolve_bank(bank_identifier, card_number)
+    return get_connector(bank) if bank else None
+
@@ -0,0 +1,98 @@
+"""
+Serialización rápida para listados de transacciones de solo lectura.
+
+`TransactionSerializer` instancia un modelo, un CardSerializer anidado y un
+campo DRF por columna para cada fila. Aquí se lee con `values()` y se
+construye el dict directamente, con la misma forma y los mismos valores que
+produce TransactionSerializer (ver `manage.py bench_serializers`, que además
+comprueba que la salida sea idéntica byte a byte).
+
+FastJSONRenderer usa orjson si está instalado y, si no, el JSONRenderer de DRF.
+"""
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+# Columnas de values() en el orden de salida de TransactionSerializer
+TRANSACTION_VALUES = [
+    'id', 'created_at', 'updated_at', 'card_id', 'tipo', 'monto', 'saldo_anterior',
+    'saldo_posterior', 'fecha_operacion', 'descripcion', 'exitoso',
+    'card__numero_tarjeta', 'card__saldo', 'card__activo', 'card__fecha_vencimiento',
+]
+
+
+def _datetime(value):
+    """Igual que serializers.DateTimeField de DRF con formato ISO 8601"""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def transaction_values(queryset):
+    """values() con las columnas que necesita serialize_transaction"""
+    return queryset.values(*TRANSACTION_VALUES)
+
+
+def serialize_transaction(row):
+    """Fila de transaction_values() -> dict con la forma de TransactionSerializer"""
+    return {
+        'id': row['id'],
+        'created_at': _datetime(row['created_at']),
+        'updated_at': _datetime(row['updated_at']),
+        'card': row['card_id'],
+        'tipo': row['tipo'],
+        'monto': _int(row['monto']),
+        'saldo_anterior': _int(row['saldo_anterior']),
+        'saldo_posterior': _int(row['saldo_posterior']),
+        'fecha_operacion': _datetime(row['fecha_operacion']),
+        'descripcion': row['descripcion'],
+        'exitoso': bool(row['exitoso']),
+        'card_detail': {
+            'id': row['card_id'],
+            'numero_tarjeta': row['card__numero_tarjeta'],
+            'saldo': _int(row['card__saldo']),
+            'activo': bool(row['card__activo']),
+            'fecha_vencimiento': _datetime(row['card__fecha_vencimiento']),
+        },
+    }
+
+
+def serialize_transactions(rows):
+    return [serialize_transaction(row) for row in rows]
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. Produce los mismos bytes que el renderer de DRF
+    con su configuración por defecto (JSON compacto, UTF-8 y U+2028/U+2029
+    escapados); sin orjson delega en DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Con indentación pedida por el cliente, el formato lo decide DRF
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # Fechas y decimales pasan por el encoder de DRF, como en su renderer
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
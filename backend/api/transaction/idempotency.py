@@ -0,0 +1,119 @@
+"""
+Soporte de la cabecera Idempotency-Key para endpoints que mueven dinero.
+
+El primer envío de una clave la reserva (fila sin status_code) y, al terminar,
+guarda la respuesta. Los reintentos con la misma clave y el mismo cuerpo
+reciben esa respuesta sin volver a ejecutar la vista; con otro cuerpo, 422;
+mientras la original sigue en curso, 409. Una reserva sin respuesta con más
+de IDEMPOTENCY_LEASE_SECONDS se da por abandonada y la puede tomar otro envío.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    """Respuesta para una clave ya existente"""
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key reutilizada con un cuerpo distinto'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is None:
+        return Response(
+            {'error': 'Hay una petición en curso con esta Idempotency-Key'},
+            status=status.HTTP_409_CONFLICT
+        )
+    response = Response(record.response_body, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _reserve(key, request, fingerprint):
+    """Devuelve (registro reservado, None) o (None, respuesta a reenviar)"""
+    now = timezone.now()
+    # Una clave caducada, o reservada por una petición que no terminó, se
+    # trata como inexistente
+    lease_expired = now - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+    IdempotencyKey.objects.filter(
+        Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lte=lease_expired),
+        clave=key, ruta=request.path,
+    ).delete()
+
+    try:
+        with db_transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                clave=key,
+                ruta=request.path,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return record, None
+    except IntegrityError:
+        existing = IdempotencyKey.objects.filter(clave=key, ruta=request.path).first()
+        if existing is None:
+            # Se liberó entre el INSERT y la lectura: que el cliente reintente
+            return None, Response(
+                {'error': 'Hay una petición en curso con esta Idempotency-Key'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return None, _replay(existing, fingerprint)
+
+
+def idempotent(method):
+    """
+    Decorador para métodos de APIView. Sin cabecera Idempotency-Key la vista
+    se ejecuta normalmente.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return method(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response(
+                {'error': 'Idempotency-Key demasiado larga (máx. 255)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = _fingerprint(request)
+        record, replay = _reserve(key, request, fingerprint)
+        if replay is not None:
+            return replay
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            # Nada que reenviar: liberar la clave para permitir el reintento
+            record.delete()
+            raise
+
+        if not isinstance(response, Response):
+            record.delete()
+            return response
+
+        # Por pk: si la reserva venció y otro envío la tomó, este UPDATE no toca nada
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            status_code=response.status_code, response_body=response.data
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,220 @@
+"""
+Importación masiva de transacciones históricas (CSV o JSONL).
+
+El fichero se lee en bloques de `chunk_size` filas y cada bloque se confirma
+en su propia transacción, así la importación no retiene el bloqueo de
+escritura de SQLite más que lo que tarda un bloque. Por bloque, las tarjetas
+nuevas se validan con una sola consulta, las transacciones se insertan con
+bulk_create y cada tarjeta afectada recibe un único UPDATE relativo a su
+saldo. Si la importación se aborta, los bloques ya confirmados se quedan:
+`last_line` indica hasta qué línea llegó y `run(start_line=...)` la reanuda.
+
+Columnas (las mismas que produce export.py; las demás se ignoran):
+- card (id) o numero_tarjeta
+- tipo: DEP, RET, TRA o REE
+- monto: entero positivo
+- fecha_operacion: opcional, fecha o fecha-hora ISO (por defecto, ahora)
+- descripcion: opcional
+- exitoso: opcional, por defecto true; las fallidas no mueven saldo
+
+Las filas de cada tarjeta se aplican en el orden del fichero y
+saldo_anterior/saldo_posterior se recalculan desde el saldo actual de la
+tarjeta, así que el fichero debe venir en orden cronológico.
+"""
+import csv
+import json
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.card.models import Card
+from .export import _parse_bound
+from .models import Transaction
+from .serializer import os_transaction_type_is_negative
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 5000
+
+
+class ImportAborted(Exception):
+    """Demasiados errores de validación; el bloque en curso se deshace"""
+
+
+def _records(stream, formato):
+    """(número de línea, fila) por cada registro; fila es None si no se puede leer"""
+    if formato == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_num, row
+
+
+def _bool(value):
+    if value is None or value == '':
+        return True
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in ('1', 'true', 'si', 'sí'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"exitoso inválido: {value}")
+
+
+def _parse_row(row):
+    """Fila cruda -> (clave de tarjeta, tipo, monto, fecha, descripcion, exitoso)"""
+    if not isinstance(row, dict):
+        raise ValueError("Registro ilegible")
+
+    if row.get('card') not in (None, ''):
+        try:
+            card_key = ('id', int(row['card']))
+        except (TypeError, ValueError):
+            raise ValueError(f"card inválido: {row['card']}")
+    elif row.get('numero_tarjeta'):
+        card_key = ('numero', str(row['numero_tarjeta']))
+    else:
+        raise ValueError("Falta card o numero_tarjeta")
+
+    tipo = row.get('tipo')
+    if tipo not in Transaction.TransactionType.values:
+        raise ValueError(f"Tipo inválido: {tipo}")
+
+    try:
+        monto = int(row.get('monto'))
+    except (TypeError, ValueError):
+        raise ValueError(f"monto inválido: {row.get('monto')}")
+    if monto <= 0:
+        raise ValueError("monto debe ser positivo")
+
+    fecha = row.get('fecha_operacion')
+    fecha = _parse_bound(fecha) if fecha else timezone.now()
+
+    return card_key, tipo, monto, fecha, row.get('descripcion') or None, _bool(row.get('exitoso'))
+
+
+class TransactionImporter:
+    def __init__(self, chunk_size=CHUNK_SIZE, max_errors=100):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.imported = 0
+        self.last_line = 0         # última línea del último bloque confirmado
+        self.errors = []
+        self._cards = {}           # ('id', 5) / ('numero', '4651...') -> id de tarjeta
+        self._changed = set()      # tarjetas cuyo saldo cambió
+        self._dry_deltas = defaultdict(int)  # en dry-run, lo que se habría abonado
+
+    def _error(self, line_num, message):
+        self.errors.append((line_num, message))
+        if len(self.errors) > self.max_errors:
+            raise ImportAborted(f"Más de {self.max_errors} errores; importación cancelada")
+
+    def _resolve_cards(self, keys):
+        """Carga en una consulta las tarjetas del bloque que aún no se conocen"""
+        missing = keys - self._cards.keys()
+        if not missing:
+            return
+        ids = {value for kind, value in missing if kind == 'id'}
+        numbers = {value for kind, value in missing if kind == 'numero'}
+        for card_id, numero in Card.objects.filter(
+            Q(id__in=ids) | Q(numero_tarjeta__in=numbers)
+        ).values_list('id', 'numero_tarjeta'):
+            self._cards[('id', card_id)] = self._cards[('numero', numero)] = card_id
+
+    def _import_chunk(self, chunk, dry_run):
+        parsed = []
+        for line_num, row in chunk:
+            try:
+                parsed.append((line_num, _parse_row(row)))
+            except ValueError as e:
+                self._error(line_num, str(e))
+
+        keys = {values[0] for _, values in parsed}
+        self._resolve_cards(keys)
+        card_ids = {self._cards[key] for key in keys if key in self._cards}
+
+        with db_transaction.atomic():
+            # El UPDATE vacío bloquea las tarjetas (en SQLite, toma el bloqueo
+            # de escritura) antes de leer los saldos
+            Card.objects.filter(pk__in=card_ids).update(saldo=F('saldo'))
+            saldos = {
+                card_id: saldo + self._dry_deltas[card_id]
+                for card_id, saldo in Card.objects.filter(pk__in=card_ids).values_list('id', 'saldo')
+            }
+
+            transactions, fechas = [], []
+            deltas = defaultdict(int)
+            for line_num, (card_key, tipo, monto, fecha, descripcion, exitoso) in parsed:
+                card_id = self._cards.get(card_key)
+                if card_id is None:
+                    self._error(line_num, f"Tarjeta no encontrada: {card_key[1]}")
+                    continue
+
+                delta = 0
+                if exitoso:
+                    delta = -monto if os_transaction_type_is_negative(tipo) else monto
+                saldo = saldos[card_id]
+                if saldo + delta < 0:
+                    self._error(line_num, "Saldo insuficiente")
+                    continue
+
+                transactions.append(Transaction(
+                    card_id=card_id, tipo=tipo, monto=monto,
+                    saldo_anterior=saldo, saldo_posterior=saldo + delta,
+                    descripcion=descripcion, exitoso=exitoso,
+                ))
+                fechas.append(fecha)
+                saldos[card_id] = saldo + delta
+                deltas[card_id] += delta
+
+            # fecha_operacion es auto_now_add: bulk_create pone la hora actual
+            # y un bulk_update (que no la toca) restaura la del fichero
+            Transaction.objects.bulk_create(transactions)
+            for tx, fecha in zip(transactions, fechas):
+                tx.fecha_operacion = fecha
+            Transaction.objects.bulk_update(transactions, ['fecha_operacion'], batch_size=500)
+
+            # Un UPDATE por tarjeta, relativo al saldo actual
+            now = timezone.now()
+            changed = {card_id: delta for card_id, delta in deltas.items() if delta}
+            for card_id, delta in changed.items():
+                Card.objects.filter(pk=card_id).update(saldo=F('saldo') + delta, updated_at=now)
+
+            if dry_run:
+                db_transaction.set_rollback(True)
+
+        if dry_run:
+            for card_id, delta in changed.items():
+                self._dry_deltas[card_id] += delta
+        self._changed.update(changed)
+        self.imported += len(transactions)
+        self.last_line = chunk[-1][0]
+
+    def run(self, stream, formato, dry_run=False, start_line=0):
+        """
+        Importa `stream` desde la línea siguiente a `start_line`, un bloque
+        por transacción; devuelve el número de tarjetas cuyo saldo cambió.
+        """
+        chunk = []
+        for line_num, row in _records(stream, formato):
+            if line_num <= start_line:
+                continue
+            chunk.append((line_num, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, dry_run)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk, dry_run)
+        return len(self._changed)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from api.transaction.archive import archive_transactions
+from api.transaction.rollups import missing_rollups
+
+
+class Command(BaseCommand):
+    help = "Mueve las transacciones antiguas de transaction_history a transaction_archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Antigüedad mínima en días (default: ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Transacciones por lote (default: 1000)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repetir cada N segundos (0 = ejecutar una vez)')
+
+    def handle(self, *args, **options):
+        # Sin checkpoint de algún agregado no se archivaría nada (ver rollups.processed_until)
+        missing = missing_rollups()
+        if missing:
+            raise CommandError(
+                f"Agregados sin ejecutar: {', '.join(missing)}. Ejecute antes "
+                f"rollup_daily_balances y rollup_monthly_spending"
+            )
+
+        while True:
+            try:
+                moved = archive_transactions(days=options['days'], batch_size=options['batch_size'])
+            except OperationalError as e:
+                # p. ej. "database is locked": se reintenta en la siguiente pasada
+                if not options['interval']:
+                    raise
+                self.stderr.write(f"Error de base de datos, se reintenta: {e}")
+            else:
+                self.stdout.write(f"Transacciones archivadas: {moved}")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,265 @@
+"""
+Benchmark de carga de /api/transactions/simulate/.
+
+Siembra usuarios y tarjetas de prueba, levanta bancos simulados locales y
+lanza pagos concurrentes. Informa req/s, latencias p50/p95/p99 y el número
+de actualizaciones de saldo perdidas (saldo final que no cuadra con el
+historial de transacciones de la tarjeta).
+
+Usar siempre contra una copia de la base de datos:
+
+    SQLITE_PATH=/tmp/bench.sqlite3 python manage.py migrate
+    SQLITE_PATH=/tmp/bench.sqlite3 python manage.py bench_payments --requests 2000 --concurrency 16
+
+Con --url se ataca un servidor ya levantado (p. ej. gunicorn con varios
+workers). Ese servidor debe usar la misma SQLITE_PATH y apuntar sus bancos a
+los stubs que imprime el comando (--stub-port fija los puertos).
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+from django.test import Client
+from django.utils import timezone
+
+from api.card.cache import card_cache
+from api.card.models import Card
+from api.transaction import banks
+from api.transaction.models import SettlementOutbox, Transaction
+from api.transaction.services import CIENSPAY_MERCHANT_CARD
+from api.transaction.stub_banks import StubBankServer
+from api.users.models import User
+
+SIMULATE_PATH = '/api/transactions/simulate/'
+
+# Escenario -> (bank_identifier, button_bank_external, usa tarjetas locales)
+SCENARIOS = {
+    'cienspay': ('cienspay', False, True),
+    'external': ('grupo3', True, True),
+    'creditbank': ('grupo3', False, False),
+    'bancobsidiana': ('grupo5', False, False),
+}
+
+DEBITS = [Transaction.TransactionType.RETIRO, Transaction.TransactionType.TRANSFERENCIA]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark de carga del endpoint de pagos con bancos simulados locales"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='cienspay')
+        parser.add_argument('--requests', type=int, default=1000, help='Pagos a enviar')
+        parser.add_argument('--concurrency', type=int, default=8, help='Clientes concurrentes')
+        parser.add_argument('--cards', type=int, default=10,
+                            help='Tarjetas a sembrar (pocas = más contención)')
+        parser.add_argument('--amount', type=int, default=1, help='Monto de cada pago')
+        parser.add_argument('--url', help='Servidor a atacar (por defecto, en proceso)')
+        parser.add_argument('--latency-ms', type=float, default=50, help='Latencia de los bancos simulados')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Latencia aleatoria adicional')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de errores 500 de los bancos')
+        parser.add_argument('--stub-port', type=int, default=0,
+                            help='Puerto base de los stubs (0 = puertos libres)')
+        parser.add_argument('--keep', action='store_true', help='No borrar los datos sembrados')
+
+    def handle(self, *args, **options):
+        stubs = self._start_stubs(options)
+        run_id = uuid.uuid4().hex[:8]
+        seeded = self._seed(run_id, options)
+
+        try:
+            if not options['url']:
+                self._route_banks_to(stubs)
+            elapsed, latencies, codes = self._drive(seeded['payloads'], options)
+            lost = self._lost_updates(seeded) if seeded['cards'] else 0
+            self._report(options, elapsed, latencies, codes, lost, stubs)
+        finally:
+            for stub in stubs.values():
+                stub.stop()
+            if not options['keep']:
+                self._cleanup(seeded)
+
+    # --- Preparación ----------------------------------------------------
+
+    def _start_stubs(self, options):
+        stubs = {}
+        for offset, name in enumerate(['creditbank', 'bancobsidiana', 'cienspay']):
+            port = options['stub_port'] + offset if options['stub_port'] else 0
+            stubs[name] = StubBankServer(
+                name, port=port,
+                latency_ms=options['latency_ms'],
+                jitter_ms=options['jitter_ms'],
+                error_rate=options['error_rate'],
+            ).start()
+
+        if options['url']:
+            self.stdout.write("Lanza el servidor con:")
+            self.stdout.write(f"  CREDITBANK_BASE_URL={stubs['creditbank'].url}")
+            self.stdout.write(f"  BANCOBSIDIANA_BASE_URL={stubs['bancobsidiana'].url}")
+            self.stdout.write(f"  CIENSPAY_BASE_URL={stubs['cienspay'].url}")
+        return stubs
+
+    def _route_banks_to(self, stubs):
+        settings.BANK_BASE_URLS = {name: stub.url for name, stub in stubs.items()}
+        banks._connectors.clear()
+        card_cache.clear()
+
+    def _seed(self, run_id, options):
+        bank_identifier, button, local = SCENARIOS[options['scenario']]
+        initial = options['requests'] * options['amount']
+        expiry = timezone.now() + timedelta(days=365)
+
+        users = [
+            User(
+                document_type='BENCH',
+                document_number=f'bench-{run_id}-{i}',
+                full_name=f'Bench {i}',
+                email=f'bench-{run_id}-{i}@bench.local',
+                password='!',
+                has_card=local,
+            )
+            for i in range(options['cards'])
+        ]
+        User.objects.bulk_create(users)
+        users = list(User.objects.filter(document_number__startswith=f'bench-{run_id}-'))
+
+        cards = []
+        if local:
+            cards = Card.objects.bulk_create([
+                Card(
+                    numero_tarjeta=Card.generate_card_number(),
+                    saldo=initial,
+                    activo=True,
+                    fecha_vencimiento=expiry,
+                    user=user,
+                )
+                for user in users
+            ])
+            numbers = [card.numero_tarjeta for card in cards]
+        else:
+            # Tarjetas de otros bancos: no existen en CiensPay
+            numbers = [f'9{random.randrange(10**14, 10**15)}' for _ in users]
+
+        merchant_created = False
+        if not Card.objects.filter(numero_tarjeta=CIENSPAY_MERCHANT_CARD).exists():
+            Card.objects.create(numero_tarjeta=CIENSPAY_MERCHANT_CARD, saldo=0,
+                                activo=True, user=users[0])
+            merchant_created = True
+
+        payloads = [
+            {
+                'button_bank_external': button,
+                'bank_identifier': bank_identifier,
+                'card_number': numbers[i % len(numbers)],
+                'expiry_date': expiry.strftime('%m/%y'),
+                'cvv': '123',
+                'amount': options['amount'],
+                'description': f'bench {run_id}',
+            }
+            for i in range(options['requests'])
+        ]
+        return {
+            'run_id': run_id,
+            'users': users,
+            'cards': cards,
+            'initial': initial,
+            'amount': options['amount'],
+            'merchant_created': merchant_created,
+            'payloads': payloads,
+        }
+
+    # --- Carga ----------------------------------------------------------
+
+    def _drive(self, payloads, options):
+        local = threading.local()
+        url = options['url']
+
+        def send(payload):
+            if url:
+                session = getattr(local, 'session', None) or requests.Session()
+                local.session = session
+                start = time.perf_counter()
+                try:
+                    code = session.post(url.rstrip('/') + SIMULATE_PATH, json=payload, timeout=60).status_code
+                except requests.exceptions.RequestException:
+                    code = 'error'
+            else:
+                client = getattr(local, 'client', None) or Client(HTTP_HOST='localhost')
+                local.client = client
+                start = time.perf_counter()
+                code = client.post(SIMULATE_PATH, payload, content_type='application/json').status_code
+            return time.perf_counter() - start, code
+
+        def worker(chunk):
+            results = [send(payload) for payload in chunk]
+            # Cada hilo abre su propia conexión a la base de datos
+            connections.close_all()
+            return results
+
+        chunks = [payloads[i::options['concurrency']] for i in range(options['concurrency'])]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = [r for chunk_results in pool.map(worker, chunks) for r in chunk_results]
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(r[0] for r in results)
+        codes = Counter(r[1] for r in results)
+        return elapsed, latencies, codes
+
+    def _lost_updates(self, seeded):
+        """Pagos cuyo descuento no se refleja en el saldo final de la tarjeta"""
+        lost = 0
+        for card in Card.objects.filter(pk__in=[c.pk for c in seeded['cards']]):
+            txs = Transaction.objects.filter(card=card)
+            debits = txs.filter(tipo__in=DEBITS).aggregate(total=Sum('monto'))['total'] or 0
+            credits = txs.exclude(tipo__in=DEBITS).aggregate(total=Sum('monto'))['total'] or 0
+            expected = seeded['initial'] - debits + credits
+            lost += abs(card.saldo - expected) // seeded['amount']
+        return lost
+
+    def _report(self, options, elapsed, latencies, codes, lost, stubs):
+        total = len(latencies)
+        self.stdout.write(f"Escenario: {options['scenario']}  pagos: {total}  "
+                          f"concurrencia: {options['concurrency']}  tarjetas: {options['cards']}")
+        self.stdout.write(f"Duración: {elapsed:.2f}s  Throughput: {total / elapsed:.1f} req/s")
+        self.stdout.write(
+            "Latencia (ms): "
+            f"p50={_percentile(latencies, 50) * 1000:.1f}  "
+            f"p95={_percentile(latencies, 95) * 1000:.1f}  "
+            f"p99={_percentile(latencies, 99) * 1000:.1f}  "
+            f"max={latencies[-1] * 1000:.1f}"
+        )
+        self.stdout.write("Respuestas: " + ", ".join(f"{code}={n}" for code, n in sorted(codes.items(), key=str)))
+        self.stdout.write("Bancos simulados: " + ", ".join(
+            f"{name}={stub.requests} ({stub.errors} errores)" for name, stub in stubs.items()
+        ))
+        style = self.style.SUCCESS if lost == 0 else self.style.ERROR
+        self.stdout.write(style(f"Actualizaciones perdidas: {lost}"))
+
+    # --- Limpieza -------------------------------------------------------
+
+    def _cleanup(self, seeded):
+        card_ids = [c.pk for c in seeded['cards']]
+        SettlementOutbox.objects.filter(card_id__in=card_ids).delete()
+        Transaction.objects.filter(card_id__in=card_ids).delete()
+        Card.objects.filter(pk__in=card_ids).delete()
+        if seeded['merchant_created']:
+            merchant = Card.objects.filter(numero_tarjeta=CIENSPAY_MERCHANT_CARD)
+            Transaction.objects.filter(card__in=merchant).delete()
+            merchant.delete()
+        User.objects.filter(pk__in=[u.pk for u in seeded['users']]).delete()
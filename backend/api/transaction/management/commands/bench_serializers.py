@@ -0,0 +1,88 @@
+"""
+Compara TransactionSerializer + JSONRenderer con el camino rápido de
+api/transaction/fastpath.py sobre N transacciones en memoria (no toca la
+base de datos) y verifica que ambos produzcan exactamente los mismos bytes.
+
+    python manage.py bench_serializers --rows 10000
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.card.models import Card
+from api.transaction.fastpath import FastJSONRenderer, orjson, serialize_transactions
+from api.transaction.models import Transaction
+from api.transaction.serializer import TransactionSerializer
+
+
+def _build_rows(n):
+    """Pares (instancia de modelo, fila de values()) con los mismos datos"""
+    now = timezone.now()
+    cards = [
+        Card(id=i + 1, numero_tarjeta=f'465100{i:09d}0', saldo=100000 + i,
+             activo=bool(i % 2), fecha_vencimiento=now + timedelta(days=365) if i % 3 else None)
+        for i in range(50)
+    ]
+    tipos = Transaction.TransactionType.values
+    objects, rows = [], []
+    for i in range(n):
+        card = cards[i % len(cards)]
+        fecha = now - timedelta(seconds=i)
+        tx = Transaction(
+            id=i + 1, card=card, tipo=tipos[i % len(tipos)], monto=i % 500 + 1,
+            saldo_anterior=10000 + i, saldo_posterior=10000 + i - (i % 500 + 1),
+            descripcion=f'Compra ñ {i}' if i % 7 else None, exitoso=bool(i % 11),
+        )
+        tx.created_at = tx.updated_at = tx.fecha_operacion = fecha
+        objects.append(tx)
+        rows.append({
+            'id': tx.id, 'created_at': fecha, 'updated_at': fecha, 'card_id': card.id,
+            'tipo': tx.tipo, 'monto': tx.monto, 'saldo_anterior': tx.saldo_anterior,
+            'saldo_posterior': tx.saldo_posterior, 'fecha_operacion': fecha,
+            'descripcion': tx.descripcion, 'exitoso': tx.exitoso,
+            'card__numero_tarjeta': card.numero_tarjeta, 'card__saldo': card.saldo,
+            'card__activo': card.activo, 'card__fecha_vencimiento': card.fecha_vencimiento,
+        })
+    return objects, rows
+
+
+def _best_of(repeat, func):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark del serializador rápido de transacciones frente a DRF"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5, help='Se toma el mejor tiempo')
+
+    def handle(self, *args, **options):
+        objects, rows = _build_rows(options['rows'])
+        payload = lambda data: {'next': None, 'next_cursor': None, 'results': data}
+
+        drf_time, drf_bytes = _best_of(options['repeat'], lambda: JSONRenderer().render(
+            payload(TransactionSerializer(objects, many=True).data)
+        ))
+        fast_time, fast_bytes = _best_of(options['repeat'], lambda: FastJSONRenderer().render(
+            payload(serialize_transactions(rows))
+        ))
+
+        if drf_bytes != fast_bytes:
+            raise CommandError("La salida del camino rápido difiere de TransactionSerializer")
+
+        self.stdout.write(f"Filas: {options['rows']}  (orjson: {'sí' if orjson else 'no'})")
+        self.stdout.write(f"DRF TransactionSerializer: {drf_time * 1000:.1f} ms")
+        self.stdout.write(f"Camino rápido:             {fast_time * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Mejora: x{drf_time / fast_time:.1f}  (salida idéntica, {len(fast_bytes)} bytes)"
+        ))
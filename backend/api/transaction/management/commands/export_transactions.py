@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.transaction.archive import archive_source
+from api.transaction.export import EXPORT_FORMATS, filter_transactions, iter_export
+
+
+class Command(BaseCommand):
+    help = "Exporta el historial de transacciones en streaming (NDJSON o CSV)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--card', type=int, help='Id de tarjeta')
+        parser.add_argument('--desde', help='Fecha (YYYY-MM-DD) o fecha-hora ISO inicial')
+        parser.add_argument('--hasta', help='Fecha (YYYY-MM-DD, inclusiva) o fecha-hora ISO final')
+        parser.add_argument('--tipo', help='DEP, RET, TRA o REE')
+        parser.add_argument('--output', '-o', help='Fichero de salida (por defecto, stdout)')
+
+    def handle(self, *args, **options):
+        filters = {name: options[name] for name in ('card', 'desde', 'hasta', 'tipo')}
+        try:
+            queryset = filter_transactions(**filters)
+        except ValueError as e:
+            raise CommandError(str(e))
+        archive = archive_source(lambda qs: filter_transactions(**filters, queryset=qs), filters['desde'])
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for chunk in iter_export(queryset, options['format'], archive=archive.queryset if archive else None):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from api.transaction.services import fold_merchant_ledger
+
+
+class Command(BaseCommand):
+    help = "Consolida los shards de la tarjeta comercio de CiensPay en su saldo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repetir cada N segundos (0 = ejecutar una vez)')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            try:
+                folded = fold_merchant_ledger()
+            except OperationalError as e:
+                # p. ej. "database is locked": se reintenta en la siguiente pasada
+                if not interval:
+                    raise
+                self.stderr.write(f"Error de base de datos, se reintenta: {e}")
+            else:
+                if folded:
+                    self.stdout.write(f"Consolidado en la tarjeta comercio: {folded}")
+
+            if not interval:
+                break
+            time.sleep(interval)
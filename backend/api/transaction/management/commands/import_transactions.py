@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.transaction.importer import CHUNK_SIZE, IMPORT_FORMATS, ImportAborted, TransactionImporter
+
+
+class Command(BaseCommand):
+    help = "Importa transacciones históricas desde CSV o JSONL en bloques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichero de entrada ('-' para stdin)")
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='Por defecto se deduce de la extensión')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help=f'Filas por bloque (default: {CHUNK_SIZE})')
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help='Cancelar si hay más filas inválidas que esto (default: 100)')
+        parser.add_argument('--start-line', type=int, default=0,
+                            help='Reanudar tras esta línea (la que indicó una importación interrumpida)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validar sin guardar nada')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        formato = options['format']
+        if formato is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            formato = 'jsonl' if extension in ('jsonl', 'ndjson') else 'csv'
+
+        importer = TransactionImporter(chunk_size=options['chunk_size'], max_errors=options['max_errors'])
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        start = time.perf_counter()
+        try:
+            cards = importer.run(
+                stream, formato, dry_run=options['dry_run'], start_line=options['start_line']
+            )
+        except ImportAborted as e:
+            self._report_errors(importer)
+            self._report_progress(importer, options)
+            raise CommandError(str(e))
+        except Exception:
+            self._report_progress(importer, options)
+            raise
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self._report_errors(importer)
+        elapsed = time.perf_counter() - start
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Importadas {importer.imported} transacciones en {elapsed:.1f} s; "
+            f"saldo recalculado en {cards} tarjetas; {len(importer.errors)} filas rechazadas"
+        ))
+
+    def _report_errors(self, importer):
+        for line_num, message in importer.errors:
+            self.stderr.write(f"Línea {line_num}: {message}")
+
+    def _report_progress(self, importer, options):
+        if options['dry_run'] or not importer.last_line:
+            return
+        self.stderr.write(
+            f"Guardadas {importer.imported} transacciones hasta la línea {importer.last_line}; "
+            f"para continuar: --start-line {importer.last_line}"
+        )
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from api.transaction.settlement import process_pending
+
+
+class Command(BaseCommand):
+    help = "Envía a los bancos externos las liquidaciones pendientes del outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Entradas a reservar por lote (default: 50)')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Segundos de espera cuando la cola está vacía (default: 1)')
+        parser.add_argument('--once', action='store_true',
+                            help='Procesar un solo lote y salir')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+
+        while True:
+            try:
+                result = process_pending(batch_size=batch_size)
+            except OperationalError as e:
+                # p. ej. "database is locked": se reintenta tras la espera
+                if options['once']:
+                    raise
+                self.stderr.write(f"Error de base de datos, se reintenta: {e}")
+                result = {}
+            processed = sum(result.values())
+            if processed:
+                self.stdout.write(
+                    f"Enviadas: {result['sent']}  Reintentos: {result['retried']}  Fallidas: {result['failed']}"
+                )
+
+            if options['once']:
+                break
+            # Si el lote vino lleno seguimos drenando sin esperar
+            if processed < batch_size:
+                time.sleep(interval)
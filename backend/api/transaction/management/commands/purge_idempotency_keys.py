@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.transaction.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Elimina las Idempotency-Key caducadas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Filas a borrar por lote (default: 5000)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        while True:
+            ids = list(
+                IdempotencyKey.objects
+                .filter(expires_at__lte=timezone.now())
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            deleted, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+            total += deleted
+
+        self.stdout.write(f"Claves eliminadas: {total}")
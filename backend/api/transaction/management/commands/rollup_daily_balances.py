@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from api.transaction.rollups import rollup_daily_balances
+
+
+class Command(BaseCommand):
+    help = "Actualiza de forma incremental el resumen diario de saldo por tarjeta"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Transacciones por lote (default: 5000)')
+        parser.add_argument('--lag-seconds', type=int, default=60,
+                            help='Ignorar transacciones más recientes que esto (default: 60)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repetir cada N segundos (0 = ejecutar una vez)')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                processed = rollup_daily_balances(
+                    batch_size=options['batch_size'],
+                    lag_seconds=options['lag_seconds'],
+                )
+            except OperationalError as e:
+                # p. ej. "database is locked": se reintenta en la siguiente pasada
+                if not options['interval']:
+                    raise
+                self.stderr.write(f"Error de base de datos, se reintenta: {e}")
+            else:
+                self.stdout.write(f"Transacciones procesadas: {processed}")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
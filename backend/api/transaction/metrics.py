@@ -0,0 +1,180 @@
+"""
+Métricas de latencia por etapa del flujo de pagos.
+
+Cada pago lleva un PaymentTimer (en un ContextVar) que acumula lo que tarda
+cada etapa: búsqueda de tarjeta, validación, escritura en BD y llamada al
+banco. Al terminar el pago las duraciones se vuelcan en histogramas en
+memoria etiquetados por (etapa, banco, resultado).
+
+Los histogramas son por proceso: con varios workers de gunicorn cada uno
+expone los suyos.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Límites superiores de los buckets, en milisegundos
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+STAGE_CARD_LOOKUP = 'card_lookup'
+STAGE_VALIDATION = 'validation'
+STAGE_DB_WRITE = 'db_write'
+STAGE_BANK_CALL = 'bank_call'
+STAGE_TOTAL = 'total'
+
+_current_timer = ContextVar('payment_timer', default=None)
+
+
+class Histogram:
+    """Histograma de buckets fijos (no acumulativos) con cuenta y suma"""
+
+    __slots__ = ('counts', 'count', 'sum_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # último bucket = +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+
+    def quantile(self, q):
+        """
+        Estimación por el límite superior del bucket que contiene el cuantil.
+        None si no hay muestras o si cae en el bucket +Inf.
+        """
+        target = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts[:-1]):
+            seen += n
+            if seen and seen >= target:
+                return BUCKETS_MS[index]
+        return None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, bank, outcome, value_ms):
+        key = (stage, bank, outcome)
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram()
+            histogram.observe(value_ms)
+
+    def snapshot(self):
+        with self._lock:
+            series = []
+            for (stage, bank, outcome), h in sorted(self._series.items()):
+                series.append({
+                    'stage': stage,
+                    'bank': bank,
+                    'outcome': outcome,
+                    'count': h.count,
+                    'sum_ms': round(h.sum_ms, 3),
+                    'avg_ms': round(h.sum_ms / h.count, 3),
+                    'p50_ms': h.quantile(0.5),
+                    'p95_ms': h.quantile(0.95),
+                    'p99_ms': h.quantile(0.99),
+                    'buckets': list(h.counts),
+                })
+        return {'buckets_ms': BUCKETS_MS + ['+Inf'], 'series': series}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = MetricsRegistry()
+
+
+class PaymentTimer:
+    def __init__(self):
+        self.durations = {}
+        self._active = set()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        # Las etapas anidadas del mismo tipo se cuentan una sola vez
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(name)
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self, bank, outcome):
+        self.durations[STAGE_TOTAL] = time.perf_counter() - self._start
+        for name, seconds in self.durations.items():
+            registry.observe(name, bank, outcome, seconds * 1000)
+
+
+@contextmanager
+def stage(name):
+    """Mide una etapa del pago en curso; no hace nada fuera de un pago"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def timed_stage(name):
+    """Decorador equivalente a `with stage(name):` alrededor de la función"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def outcome_for(status_code):
+    if status_code < 400:
+        return 'ok'
+    if status_code < 500:
+        return 'rejected'
+    if status_code in (502, 503, 504):
+        return 'bank_error'
+    return 'error'
+
+
+def instrumented_payment(method):
+    """
+    Decorador para el POST de las vistas de pago: activa un PaymentTimer y
+    al terminar registra sus etapas con el banco y el resultado como etiquetas.
+    """
+    # Import diferido: banks importa este módulo
+    from .banks import resolve_bank
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        timer = PaymentTimer()
+        token = _current_timer.set(timer)
+        response = None
+        try:
+            response = method(self, request, *args, **kwargs)
+            return response
+        finally:
+            _current_timer.reset(token)
+            data = request.data if hasattr(request.data, 'get') else {}
+            bank = resolve_bank(data.get('bank_identifier'), data.get('card_number')) or 'unknown'
+            status_code = getattr(response, 'status_code', 500)
+            timer.finish(bank, outcome_for(status_code))
+
+    return wrapper
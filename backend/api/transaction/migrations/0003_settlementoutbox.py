@@ -0,0 +1,39 @@
+# Generated by Django 5.2.11 on 2026-10-18 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0002_alter_card_numero_tarjeta'),
+        ('transaction', '0002_alter_transaction_monto_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SettlementOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última modificación')),
+                ('banco', models.CharField(max_length=30)),
+                ('metodo', models.CharField(max_length=10)),
+                ('ruta', models.CharField(max_length=255)),
+                ('payload', models.JSONField()),
+                ('monto', models.BigIntegerField()),
+                ('estado', models.CharField(choices=[('PEN', 'Pendiente'), ('PRO', 'Procesando'), ('ENV', 'Enviado'), ('FAL', 'Fallido')], default='PEN', max_length=3)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True, null=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='settlements', to='card.card')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='settlements', to='transaction.transaction')),
+            ],
+            options={
+                'db_table': 'settlement_outbox',
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='settlement__estado_119a09_idx')],
+            },
+        ),
+    ]
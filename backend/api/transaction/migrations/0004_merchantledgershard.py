@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-18 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0002_alter_card_numero_tarjeta'),
+        ('transaction', '0003_settlementoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerchantLedgerShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('saldo', models.BigIntegerField(default=0)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_shards', to='card.card')),
+            ],
+            options={
+                'db_table': 'merchant_ledger_shards',
+                'constraints': [models.UniqueConstraint(fields=('card', 'shard'), name='unique_merchant_ledger_shard')],
+            },
+        ),
+    ]
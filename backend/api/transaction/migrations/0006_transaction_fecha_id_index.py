@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-fecha_operacion', '-id'], name='transaction_fecha_o_f7e8f2_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.11 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0002_alter_card_numero_tarjeta'),
+        ('transaction', '0006_transaction_fecha_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='CardDailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('saldo_apertura', models.BigIntegerField()),
+                ('saldo_cierre', models.BigIntegerField()),
+                ('total_debitos', models.BigIntegerField(default=0)),
+                ('total_creditos', models.BigIntegerField(default=0)),
+                ('num_debitos', models.PositiveIntegerField(default=0)),
+                ('num_creditos', models.PositiveIntegerField(default=0)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='card.card')),
+            ],
+            options={
+                'db_table': 'card_daily_balances',
+                'ordering': ['card', 'dia'],
+                'indexes': [models.Index(fields=['dia'], name='card_daily__dia_c00609_idx')],
+                'constraints': [models.UniqueConstraint(fields=('card', 'dia'), name='unique_card_daily_balance')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+# Índice FTS5 (SQLite) sobre descripcion, sincronizado con triggers.
+# En otros motores la búsqueda de texto usa icontains (ver search.py).
+FTS_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transaction_fts USING fts5(
+        descripcion,
+        content='transaction_history',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transaction_fts_ai AFTER INSERT ON transaction_history BEGIN
+        INSERT INTO transaction_fts(rowid, descripcion) VALUES (new.id, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transaction_fts_ad AFTER DELETE ON transaction_history BEGIN
+        INSERT INTO transaction_fts(transaction_fts, rowid, descripcion)
+        VALUES ('delete', old.id, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transaction_fts_au AFTER UPDATE OF descripcion ON transaction_history BEGIN
+        INSERT INTO transaction_fts(transaction_fts, rowid, descripcion)
+        VALUES ('delete', old.id, old.descripcion);
+        INSERT INTO transaction_fts(rowid, descripcion) VALUES (new.id, new.descripcion);
+    END
+    """,
+    "INSERT INTO transaction_fts(transaction_fts) VALUES ('rebuild')",
+]
+
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS transaction_fts_au",
+    "DROP TRIGGER IF EXISTS transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS transaction_fts_ai",
+    "DROP TABLE IF EXISTS transaction_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0007_rollupcheckpoint_carddailybalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['tipo', '-fecha_operacion', '-id'], name='transaction_tipo_0e4790_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['exitoso', '-fecha_operacion', '-id'], name='transaction_exitoso_e89644_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['monto', '-fecha_operacion'], name='transaction_monto_90ec3d_idx'),
+        ),
+        migrations.RunPython(_run(FTS_CREATE), _run(FTS_DROP)),
+    ]
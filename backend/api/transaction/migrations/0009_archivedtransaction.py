@@ -0,0 +1,39 @@
+# Generated by Django 5.2.11 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0002_alter_card_numero_tarjeta'),
+        ('transaction', '0008_transaction_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('tipo', models.CharField(choices=[('DEP', 'Depósito'), ('RET', 'Retiro/Pago'), ('TRA', 'Transferencia'), ('REE', 'Reembolso')], max_length=3)),
+                ('monto', models.BigIntegerField()),
+                ('saldo_anterior', models.BigIntegerField()),
+                ('saldo_posterior', models.BigIntegerField()),
+                ('fecha_operacion', models.DateTimeField()),
+                ('descripcion', models.CharField(blank=True, max_length=255, null=True)),
+                ('exitoso', models.BooleanField(default=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_transactions', to='card.card')),
+            ],
+            options={
+                'db_table': 'transaction_archive',
+                'ordering': ['-fecha_operacion'],
+                'indexes': [
+                    models.Index(fields=['card', '-fecha_operacion'], name='transaction_card_id_16f874_idx'),
+                    models.Index(fields=['-fecha_operacion', '-id'], name='transaction_fecha_o_c74b9e_idx'),
+                ],
+            },
+        ),
+    ]
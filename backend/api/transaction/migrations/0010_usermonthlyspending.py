@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0009_archivedtransaction'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserMonthlySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('tipo', models.CharField(choices=[('DEP', 'Depósito'), ('RET', 'Retiro/Pago'), ('TRA', 'Transferencia'), ('REE', 'Reembolso')], max_length=3)),
+                ('total', models.BigIntegerField(default=0)),
+                ('num', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spending', to='users.user')),
+            ],
+            options={
+                'db_table': 'user_monthly_spending',
+                'ordering': ['user', 'mes', 'tipo'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'mes', 'tipo'), name='unique_user_monthly_spending')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def count_failed(apps, schema_editor):
+    """
+    Las pasadas anteriores de rollup_daily_balances ignoraban las
+    transacciones fallidas: se cuentan las que ya quedaron tras el checkpoint.
+    """
+    RollupCheckpoint = apps.get_model('transaction', 'RollupCheckpoint')
+    CardDailyBalance = apps.get_model('transaction', 'CardDailyBalance')
+    checkpoint = RollupCheckpoint.objects.filter(nombre='daily_balances').first()
+    if checkpoint is None:
+        return
+
+    saldos, counts = {}, Counter()
+    for model_name in ('Transaction', 'ArchivedTransaction'):
+        rows = (
+            apps.get_model('transaction', model_name).objects
+            .filter(exitoso=False, id__lte=checkpoint.ultimo_id)
+            .values_list('card_id', 'fecha_operacion', 'saldo_anterior')
+        )
+        for card_id, fecha, saldo in rows:
+            key = (card_id, timezone.localtime(fecha).date())
+            counts[key] += 1
+            saldos.setdefault(key, saldo)
+
+    for (card_id, dia), num in counts.items():
+        row, _ = CardDailyBalance.objects.get_or_create(
+            card_id=card_id, dia=dia,
+            defaults={'saldo_apertura': saldos[card_id, dia], 'saldo_cierre': saldos[card_id, dia]},
+        )
+        row.num_fallidas += num
+        row.save(update_fields=['num_fallidas'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0010_usermonthlyspending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carddailybalance',
+            name='num_fallidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_failed, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from api.models import BaseModel
 
 class Transaction(BaseModel, models.Model):
@@ -27,7 +29,218 @@ class Transaction(BaseModel, models.Model):
         indexes = [
             models.Index(fields=['card', '-fecha_operacion']),
             models.Index(fields=['tipo']),
+            # Paginación por cursor del historial completo
+            models.Index(fields=['-fecha_operacion', '-id']),
+            # Búsqueda multicriterio (api/transaction/search.py)
+            models.Index(fields=['tipo', '-fecha_operacion', '-id']),
+            models.Index(fields=['exitoso', '-fecha_operacion', '-id']),
+            models.Index(fields=['monto', '-fecha_operacion']),
         ]
 
     def __str__(self):
         return f"{self.tipo} - {self.monto} - Card: {self.card.numero_tarjeta}"
+
+
+class SettlementOutbox(BaseModel, models.Model):
+    """
+    Outbox de liquidaciones pendientes con bancos externos.
+
+    Se inserta en la misma transacción que el descuento local, así que un pago
+    confirmado siempre tiene su liquidación registrada. El comando
+    `process_settlements` la envía al banco en segundo plano con reintentos.
+    """
+    class Status(models.TextChoices):
+        PENDIENTE = 'PEN', 'Pendiente'
+        PROCESANDO = 'PRO', 'Procesando'
+        ENVIADO = 'ENV', 'Enviado'
+        FALLIDO = 'FAL', 'Fallido'
+
+    banco = models.CharField(max_length=30)
+    metodo = models.CharField(max_length=10)
+    ruta = models.CharField(max_length=255)
+    payload = models.JSONField()
+
+    card = models.ForeignKey('card.Card', on_delete=models.PROTECT, related_name='settlements')
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='settlements'
+    )
+    monto = models.BigIntegerField()
+
+    estado = models.CharField(max_length=3, choices=Status.choices, default=Status.PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'settlement_outbox'
+        app_label = 'transaction'
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        return f"{self.banco} {self.metodo} {self.ruta} - {self.estado} ({self.intentos})"
+
+
+class MerchantLedgerShard(models.Model):
+    """
+    Sub-cuenta de una tarjeta comercio muy concurrida.
+
+    Los abonos se reparten al azar entre N filas en lugar de escribir siempre
+    la misma fila de `cards`, así los pagos concurrentes no se serializan.
+    El saldo real es `card.saldo + SUM(shard.saldo)`; el comando
+    `fold_merchant_ledger` traspasa periódicamente los shards a la tarjeta
+    (cada 5 s en docker-compose). Las lecturas de `cards.saldo` (listados,
+    total_balance) van por detrás como mucho ese intervalo; los cargos y los
+    ajustes de saldo de la tarjeta comercio consolidan antes.
+    """
+    card = models.ForeignKey('card.Card', on_delete=models.CASCADE, related_name='ledger_shards')
+    shard = models.PositiveSmallIntegerField()
+    saldo = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'merchant_ledger_shards'
+        app_label = 'transaction'
+        constraints = [
+            models.UniqueConstraint(fields=['card', 'shard'], name='unique_merchant_ledger_shard'),
+        ]
+
+    def __str__(self):
+        return f"Shard {self.shard} - {self.saldo} - Card: {self.card_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta guardada para una cabecera Idempotency-Key.
+
+    Un reintento con la misma clave devuelve la respuesta original sin volver
+    a tocar Card ni Transaction. `status_code` vacío significa que la petición
+    original sigue en curso. Las claves caducan en `expires_at`.
+    """
+    clave = models.CharField(max_length=255)
+    ruta = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        app_label = 'transaction'
+        constraints = [
+            models.UniqueConstraint(fields=['clave', 'ruta'], name='unique_idempotency_key_ruta'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} {self.ruta} - {self.status_code or 'en curso'}"
+
+
+class RollupCheckpoint(models.Model):
+    """Último id de transaction_history ya procesado por cada agregado incremental"""
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_checkpoints'
+        app_label = 'transaction'
+
+    def __str__(self):
+        return f"{self.nombre} - {self.ultimo_id}"
+
+
+class CardDailyBalance(models.Model):
+    """
+    Resumen diario por tarjeta: saldo de apertura y cierre, totales y número
+    de débitos, créditos y transacciones fallidas (que no mueven saldo). Lo
+    mantiene el comando `rollup_daily_balances`.
+    """
+    card = models.ForeignKey('card.Card', on_delete=models.CASCADE, related_name='daily_balances')
+    dia = models.DateField()
+
+    saldo_apertura = models.BigIntegerField()
+    saldo_cierre = models.BigIntegerField()
+    total_debitos = models.BigIntegerField(default=0)
+    total_creditos = models.BigIntegerField(default=0)
+    num_debitos = models.PositiveIntegerField(default=0)
+    num_creditos = models.PositiveIntegerField(default=0)
+    num_fallidas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'card_daily_balances'
+        app_label = 'transaction'
+        ordering = ['card', 'dia']
+        constraints = [
+            models.UniqueConstraint(fields=['card', 'dia'], name='unique_card_daily_balance'),
+        ]
+        indexes = [
+            models.Index(fields=['dia']),
+        ]
+
+    def __str__(self):
+        return f"Card {self.card_id} - {self.dia}: {self.saldo_apertura} -> {self.saldo_cierre}"
+
+
+
+class ArchivedTransaction(models.Model):
+    """
+    Transacciones antiguas movidas desde transaction_history por el comando
+    `archive_transactions` (ver api/transaction/archive.py). Conserva el id y
+    todas las columnas de la fila original; solo tiene los índices que usan
+    las lecturas históricas.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    card = models.ForeignKey('card.Card', on_delete=models.PROTECT, related_name='archived_transactions')
+
+    tipo = models.CharField(max_length=3, choices=Transaction.TransactionType.choices)
+    monto = models.BigIntegerField()
+
+    saldo_anterior = models.BigIntegerField()
+    saldo_posterior = models.BigIntegerField()
+
+    fecha_operacion = models.DateTimeField()
+    descripcion = models.CharField(max_length=255, blank=True, null=True)
+    exitoso = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'transaction_archive'
+        app_label = 'transaction'
+        ordering = ['-fecha_operacion']
+        indexes = [
+            models.Index(fields=['card', '-fecha_operacion']),
+            models.Index(fields=['-fecha_operacion', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} - {self.monto} - Card: {self.card_id} (archivada)"
+
+
+class UserMonthlySpending(models.Model):
+    """
+    Total y número de transacciones exitosas por usuario, mes y tipo. Lo
+    mantiene el comando `rollup_monthly_spending` (ver rollups.py).
+    """
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='monthly_spending')
+    mes = models.DateField(help_text='Primer día del mes')
+    tipo = models.CharField(max_length=3, choices=Transaction.TransactionType.choices)
+
+    total = models.BigIntegerField(default=0)
+    num = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'user_monthly_spending'
+        app_label = 'transaction'
+        ordering = ['user', 'mes', 'tipo']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'mes', 'tipo'], name='unique_user_monthly_spending'),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id} - {self.mes:%Y-%m} {self.tipo}: {self.total} ({self.num})"
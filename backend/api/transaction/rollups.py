@@ -0,0 +1,333 @@
+"""
+Agregados incrementales sobre transaction_history.
+
+Cada agregado guarda en RollupCheckpoint el último id procesado y en cada
+pasada solo lee las transacciones nuevas, en orden de id. La pasada se
+detiene en la primera transacción con menos de `lag_seconds` de antigüedad:
+así una transacción con id menor que aún no había hecho commit no se queda
+atrás del checkpoint. No basta con filtrar por fecha, porque las filas
+importadas (importer.py) tienen ids altos y fechas antiguas y harían saltar
+el checkpoint por encima de pagos recientes.
+"""
+from datetime import timedelta
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, DateField, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    ArchivedTransaction, CardDailyBalance, RollupCheckpoint, Transaction, UserMonthlySpending
+)
+
+DAILY_BALANCES = 'daily_balances'
+MONTHLY_SPENDING = 'monthly_spending'
+
+# Agregados que leen transaction_history; el archivado no mueve filas que
+# alguno de ellos aún no haya procesado
+ROLLUPS = (DAILY_BALANCES, MONTHLY_SPENDING)
+
+
+def pending_batch(nombre, batch_size, lag_seconds, fields):
+    """
+    (checkpoint, filas) con las siguientes `batch_size` transacciones
+    posteriores al checkpoint `nombre`, ordenadas por id y cortadas antes de
+    la primera demasiado reciente. `fields` debe empezar por 'id' e incluir
+    'fecha_operacion'.
+    """
+    checkpoint, _ = RollupCheckpoint.objects.get_or_create(nombre=nombre)
+    cutoff = timezone.now() - timedelta(seconds=lag_seconds)
+    rows = list(
+        Transaction.objects
+        .filter(id__gt=checkpoint.ultimo_id)
+        .order_by('id')
+        .values_list(*fields)[:batch_size]
+    )
+    fecha = fields.index('fecha_operacion')
+    for position, row in enumerate(rows):
+        if row[fecha] >= cutoff:
+            return checkpoint, rows[:position]
+    return checkpoint, rows
+
+
+def processed_until():
+    """Mayor id ya procesado por todos los agregados de ROLLUPS (0 si alguno no ha corrido)"""
+    checkpoints = dict(
+        RollupCheckpoint.objects.filter(nombre__in=ROLLUPS).values_list('nombre', 'ultimo_id')
+    )
+    return min(checkpoints.get(nombre, 0) for nombre in ROLLUPS)
+
+
+def missing_rollups():
+    """Agregados de ROLLUPS que no han corrido nunca (sin checkpoint)"""
+    existing = set(RollupCheckpoint.objects.filter(nombre__in=ROLLUPS).values_list('nombre', flat=True))
+    return [nombre for nombre in ROLLUPS if nombre not in existing]
+
+
+def advance_checkpoint(checkpoint, ultimo_id):
+    """
+    Mueve el checkpoint de forma condicional; si otro proceso lo movió antes,
+    lanza RuntimeError para deshacer la transacción en curso.
+    """
+    moved = RollupCheckpoint.objects.filter(
+        pk=checkpoint.pk, ultimo_id=checkpoint.ultimo_id
+    ).update(ultimo_id=ultimo_id, updated_at=timezone.now())
+    if not moved:
+        raise RuntimeError(f"El checkpoint {checkpoint.nombre} fue modificado por otro proceso")
+
+
+DAILY_COUNTERS = ('total_debitos', 'total_creditos', 'num_debitos', 'num_creditos', 'num_fallidas')
+
+
+def _fold_daily(rows):
+    """Agrupa las filas por (tarjeta, día) en el orden en que llegan"""
+    groups = {}
+    for _, card_id, fecha, saldo_anterior, saldo_posterior, exitoso in rows:
+        key = (card_id, timezone.localtime(fecha).date())
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'saldo_apertura': saldo_anterior, 'saldo_cierre': saldo_anterior,
+                'total_debitos': 0, 'total_creditos': 0,
+                'num_debitos': 0, 'num_creditos': 0, 'num_fallidas': 0,
+            }
+        if not exitoso:
+            # No mueve saldo; solo cuenta para el total de transacciones
+            group['num_fallidas'] += 1
+            continue
+        group['saldo_cierre'] = saldo_posterior
+
+        # La dirección se deduce del saldo: TRA puede ser cargo o abono
+        delta = saldo_posterior - saldo_anterior
+        if delta < 0:
+            group['total_debitos'] += -delta
+            group['num_debitos'] += 1
+        else:
+            group['total_creditos'] += delta
+            group['num_creditos'] += 1
+    return groups
+
+
+def rollup_daily_balances(batch_size=5000, lag_seconds=60):
+    """Procesa las transacciones pendientes; devuelve cuántas se leyeron"""
+    processed = 0
+    fields = ['id', 'card_id', 'fecha_operacion', 'saldo_anterior', 'saldo_posterior', 'exitoso']
+
+    while True:
+        with db_transaction.atomic():
+            checkpoint, rows = pending_batch(DAILY_BALANCES, batch_size, lag_seconds, fields)
+            if not rows:
+                break
+
+            groups = _fold_daily(rows)
+            existing = {
+                (row.card_id, row.dia): row
+                for row in CardDailyBalance.objects.filter(
+                    card_id__in={card_id for card_id, _ in groups},
+                    dia__in={dia for _, dia in groups},
+                )
+            }
+
+            to_create, to_update = [], []
+            for (card_id, dia), group in groups.items():
+                row = existing.get((card_id, dia))
+                if row is None:
+                    to_create.append(CardDailyBalance(card_id=card_id, dia=dia, **group))
+                    continue
+                row.saldo_cierre = group['saldo_cierre']
+                for field in DAILY_COUNTERS:
+                    setattr(row, field, getattr(row, field) + group[field])
+                to_update.append(row)
+
+            CardDailyBalance.objects.bulk_create(to_create)
+            CardDailyBalance.objects.bulk_update(to_update, ['saldo_cierre', *DAILY_COUNTERS])
+            advance_checkpoint(checkpoint, rows[-1][0])
+
+        processed += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    return processed
+
+
+def transaction_count():
+    """
+    Expresión para anotar o agregar sobre Card: número de transacciones de
+    la tarjeta (historial y archivo). Suma los contadores de
+    card_daily_balances y cuenta solo las transacciones posteriores a su
+    checkpoint, así el coste depende de los días con actividad y no de todo
+    el historial. El archivo no hace falta: solo guarda filas ya procesadas.
+    """
+    ultimo_id = Coalesce(Subquery(
+        RollupCheckpoint.objects.filter(nombre=DAILY_BALANCES).values('ultimo_id')[:1]
+    ), 0)
+    rolled = (
+        CardDailyBalance.objects
+        .filter(card=OuterRef('pk'))
+        .order_by()
+        .values('card')
+        .annotate(total=Sum(F('num_debitos') + F('num_creditos') + F('num_fallidas')))
+        .values('total')
+    )
+    tail = (
+        Transaction.objects
+        .filter(card=OuterRef('pk'), id__gt=ultimo_id)
+        .order_by()
+        .values('card')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rolled), 0) + Coalesce(Subquery(tail), 0)
+
+
+# --- Gasto mensual por usuario y tipo -----------------------------------
+
+MONTHLY_FIELDS = ['id', 'card__user_id', 'fecha_operacion', 'tipo', 'monto', 'exitoso']
+
+
+def _month(fecha):
+    return timezone.localtime(fecha).date().replace(day=1)
+
+
+def _fold_monthly(rows):
+    """Agrupa filas de MONTHLY_FIELDS por (usuario, mes, tipo) -> [total, num]"""
+    groups = {}
+    for _, user_id, fecha, tipo, monto, exitoso in rows:
+        if not exitoso:
+            continue
+        group = groups.setdefault((user_id, _month(fecha), tipo), [0, 0])
+        group[0] += monto
+        group[1] += 1
+    return groups
+
+
+def _add_monthly(groups):
+    """Suma `groups` a user_monthly_spending"""
+    existing = {
+        (row.user_id, row.mes, row.tipo): row
+        for row in UserMonthlySpending.objects.filter(
+            user_id__in={user_id for user_id, _, _ in groups},
+            mes__in={mes for _, mes, _ in groups},
+        )
+    }
+
+    to_create, to_update = [], []
+    for (user_id, mes, tipo), (total, num) in groups.items():
+        row = existing.get((user_id, mes, tipo))
+        if row is None:
+            to_create.append(UserMonthlySpending(user_id=user_id, mes=mes, tipo=tipo, total=total, num=num))
+            continue
+        row.total += total
+        row.num += num
+        to_update.append(row)
+
+    UserMonthlySpending.objects.bulk_create(to_create)
+    UserMonthlySpending.objects.bulk_update(to_update, ['total', 'num'])
+
+
+def rollup_monthly_spending(batch_size=5000, lag_seconds=60):
+    """Procesa las transacciones pendientes; devuelve cuántas se leyeron"""
+    processed = 0
+
+    while True:
+        with db_transaction.atomic():
+            checkpoint, rows = pending_batch(MONTHLY_SPENDING, batch_size, lag_seconds, MONTHLY_FIELDS)
+            if not rows:
+                break
+            _add_monthly(_fold_monthly(rows))
+            advance_checkpoint(checkpoint, rows[-1][0])
+
+        processed += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    return processed
+
+
+def rebuild_monthly_spending(lag_seconds=60):
+    """
+    Recalcula user_monthly_spending desde cero con GROUP BY sobre el
+    historial y el archivo, y deja el checkpoint en el último id incluido.
+    Devuelve el número de filas del agregado.
+    """
+    cutoff = timezone.now() - timedelta(seconds=lag_seconds)
+
+    with db_transaction.atomic():
+        checkpoint, _ = RollupCheckpoint.objects.get_or_create(nombre=MONTHLY_SPENDING)
+        # Mismo corte que pending_batch: hasta antes de la primera transacción reciente
+        recent = Transaction.objects.filter(fecha_operacion__gte=cutoff).aggregate(m=Min('id'))['m']
+        ultimo_id = recent - 1 if recent else max(
+            Transaction.objects.aggregate(m=Max('id'))['m'] or 0,
+            ArchivedTransaction.objects.aggregate(m=Max('id'))['m'] or 0,
+        )
+
+        groups = {}
+        for model in (Transaction, ArchivedTransaction):
+            rows = (
+                model.objects
+                .filter(id__lte=ultimo_id, exitoso=True)
+                .annotate(mes=TruncMonth('fecha_operacion', output_field=DateField()))
+                .order_by()
+                .values('card__user_id', 'mes', 'tipo')
+                .annotate(total=Sum('monto'), num=Count('id'))
+                .values_list('card__user_id', 'mes', 'tipo', 'total', 'num')
+            )
+            for user_id, mes, tipo, total, num in rows:
+                group = groups.setdefault((user_id, mes, tipo), [0, 0])
+                group[0] += total
+                group[1] += num
+
+        UserMonthlySpending.objects.all().delete()
+        UserMonthlySpending.objects.bulk_create([
+            UserMonthlySpending(user_id=user_id, mes=mes, tipo=tipo, total=total, num=num)
+            for (user_id, mes, tipo), (total, num) in groups.items()
+        ], batch_size=1000)
+        RollupCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            ultimo_id=ultimo_id, updated_at=timezone.now()
+        )
+
+    return len(groups)
+
+
+def monthly_spending(user_id, desde=None, hasta=None):
+    """
+    Gasto mensual de un usuario por tipo, entre los meses `desde` y `hasta`
+    (primer día del mes, inclusivos). Suma al agregado las transacciones
+    posteriores al checkpoint, así el resultado está al día aunque el comando
+    no haya corrido todavía. Esa cola se agrupa en SQL y es corta mientras
+    `rollup_monthly_spending --interval` esté en marcha (docker-compose).
+    """
+    queryset = UserMonthlySpending.objects.filter(user_id=user_id)
+    if desde:
+        queryset = queryset.filter(mes__gte=desde)
+    if hasta:
+        queryset = queryset.filter(mes__lte=hasta)
+    groups = {
+        (mes, tipo): [total, num]
+        for mes, tipo, total, num in queryset.values_list('mes', 'tipo', 'total', 'num')
+    }
+
+    ultimo_id = (
+        RollupCheckpoint.objects.filter(nombre=MONTHLY_SPENDING)
+        .values_list('ultimo_id', flat=True).first() or 0
+    )
+    tail = (
+        Transaction.objects
+        .filter(id__gt=ultimo_id, card__user_id=user_id, exitoso=True)
+        .annotate(mes=TruncMonth('fecha_operacion', output_field=DateField()))
+        .order_by()
+        .values('mes', 'tipo')
+        .annotate(total=Sum('monto'), num=Count('id'))
+        .values_list('mes', 'tipo', 'total', 'num')
+    )
+    for mes, tipo, total, num in tail:
+        if (desde and mes < desde) or (hasta and mes > hasta):
+            continue
+        group = groups.setdefault((mes, tipo), [0, 0])
+        group[0] += total
+        group[1] += num
+
+    return [
+        {'mes': mes, 'tipo': tipo, 'total': total, 'num': num}
+        for (mes, tipo), (total, num) in sorted(groups.items())
+    ]
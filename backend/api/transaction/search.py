@@ -0,0 +1,82 @@
+"""
+Búsqueda multicriterio sobre el historial de transacciones.
+
+Los filtros por tipo, exitoso, monto y fechas se apoyan en los índices
+compuestos de Transaction.Meta; el texto de la descripción se busca en la
+tabla FTS5 `transaction_fts` (migración 0008) cuando la base es SQLite y con
+icontains en otros motores y en transaction_archive. El resultado se pagina por cursor sobre
+(fecha_operacion, id), así cada consulta lee como mucho una página.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .export import filter_transactions
+from .models import Transaction
+
+FTS_TABLE = 'transaction_fts'
+_TOKEN = re.compile(r'\w+')
+
+
+def _bool(value):
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'si', 'sí'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Valor booleano inválido: {value}")
+
+
+def _amount(value, name):
+    try:
+        amount = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} debe ser un entero")
+    if amount < 0:
+        raise ValueError(f"{name} no puede ser negativo")
+    return amount
+
+
+def fts_query(text):
+    """Texto libre -> consulta FTS5: cada palabra como prefijo, todas requeridas"""
+    return ' '.join(f'"{token}"*' for token in _TOKEN.findall(text))
+
+
+def search_transactions(params, queryset=None):
+    """
+    Queryset filtrado según `params` (card, desde, hasta, tipo, exitoso,
+    monto_min, monto_max, q). `queryset` permite buscar en el archivo, que
+    no tiene índice FTS. Lanza ValueError si algún filtro es inválido.
+    """
+    queryset = filter_transactions(
+        card=params.get('card'),
+        desde=params.get('desde'),
+        hasta=params.get('hasta'),
+        tipo=params.get('tipo'),
+        queryset=queryset,
+    )
+
+    exitoso = params.get('exitoso')
+    if exitoso:
+        queryset = queryset.filter(exitoso=_bool(exitoso))
+
+    monto_min, monto_max = params.get('monto_min'), params.get('monto_max')
+    if monto_min:
+        queryset = queryset.filter(monto__gte=_amount(monto_min, 'monto_min'))
+    if monto_max:
+        queryset = queryset.filter(monto__lte=_amount(monto_max, 'monto_max'))
+
+    text = (params.get('q') or '').strip()
+    if text:
+        if connection.vendor == 'sqlite' and queryset.model is Transaction:
+            query = fts_query(text)
+            if not query:
+                return queryset.none()
+            queryset = queryset.filter(id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]
+            ))
+        else:
+            queryset = queryset.filter(descripcion__icontains=text)
+
+    return queryset
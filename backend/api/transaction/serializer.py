@@ -2,6 +2,7 @@ from rest_framework import serializers
 
 from api.card.models import Card
 from .models import  Transaction
+from .services import InsufficientFundsError, credit_card, debit_card
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.hashers import make_password
 
@@ -57,23 +58,15 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
         card = validated_data['card']
         monto = validated_data['monto']
         tipo = validated_data['tipo']
+        descripcion = validated_data.get('descripcion')
         
-        # 1. Registrar saldo anterior
-        validated_data['saldo_anterior'] = card.saldo
-        
-        # 2. Actualizar saldo
-        if os_transaction_type_is_negative(tipo):
-            card.saldo -= monto
-        else:
-            card.saldo += monto
-            
-        card.save()
-        
-        # 3. Registrar saldo posterior
-        validated_data['saldo_posterior'] = card.saldo
-        
-        # 4. Crear transacción
-        return super().create(validated_data)
+        # Saldo y transacción se registran en una sola operación atómica
+        try:
+            if os_transaction_type_is_negative(tipo):
+                return debit_card(card, monto, descripcion, tipo=tipo)
+            return credit_card(card, monto, descripcion, tipo=tipo)
+        except InsufficientFundsError:
+            raise serializers.ValidationError("Saldo insuficiente para realizar esta transacción.")
 
 def os_transaction_type_is_negative(tipo):
     # Asumiendo que RETIRO y TRANSFERENCIA restan
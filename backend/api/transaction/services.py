@@ -0,0 +1,312 @@
+"""
+Capa de servicio de pagos.
+
+Todas las operaciones que mueven saldo de una tarjeta pasan por aquí: el
+UPDATE del saldo y el INSERT en transaction_history se hacen en una sola
+transacción de base de datos, usando un UPDATE condicional con F() para que
+varios workers puedan cobrar la misma tarjeta en paralelo sin perder
+actualizaciones.
+"""
+import random
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from api.card.cache import get_card_by_number
+from api.card.models import Card
+from .metrics import STAGE_DB_WRITE, timed_stage
+from .models import MerchantLedgerShard, Transaction
+
+# Tarjeta comercio de CiensPay que recibe los pagos liquidados
+CIENSPAY_MERCHANT_CARD = '4651001855562775'
+
+
+class PaymentError(Exception):
+    """Error de negocio al mover saldo de una tarjeta"""
+
+
+class InsufficientFundsError(PaymentError):
+    """La tarjeta no tiene saldo suficiente para el cargo (o no está activa)"""
+
+
+def parse_amount(value):
+    """
+    Monto de un pago como entero positivo. Card.saldo y Transaction.monto
+    son enteros, así que se rechazan los montos con decimales (12.0 vale,
+    12.5 no). Lanza ValueError si el monto no es válido.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError('Monto inválido')
+    if not amount.is_finite() or amount <= 0 or amount != amount.to_integral_value():
+        raise ValueError('Monto inválido')
+    return int(amount)
+
+
+def validate_card_for_payment(card, expiry_date):
+    """
+    Valida estado y vencimiento (formato "MM/YY") de una tarjeta CiensPay.
+    Devuelve el mensaje de error o None si la tarjeta puede pagar.
+    """
+    if not card.activo:
+        return 'La tarjeta no está activa'
+
+    try:
+        exp_month, exp_year = map(int, expiry_date.split('/'))
+    except (ValueError, AttributeError):
+        return 'Formato de fecha de vencimiento inválido'
+    # Convertir año de 2 dígitos a 4 (asumiendo 20xx)
+    exp_year += 2000
+
+    if card.fecha_vencimiento:
+        if card.fecha_vencimiento.year != exp_year or card.fecha_vencimiento.month != exp_month:
+            return 'Fecha de vencimiento incorrecta'
+        if card.fecha_vencimiento < timezone.now():
+            return 'La tarjeta ha expirado'
+
+    return None
+
+
+def _apply_movement(card, amount, delta, tipo, descripcion, require_funds, require_active=False):
+    """
+    Aplica `delta` al saldo de `card` y registra la transacción.
+
+    Debe llamarse dentro de un bloque atómico. El UPDATE es condicional, así
+    que la comprobación de fondos y el descuento ocurren en la misma sentencia.
+    """
+    if not isinstance(amount, int):
+        # Un float escribiría decimales en la columna entera de saldo
+        raise ValueError(f'El monto debe ser entero (use parse_amount): {amount!r}')
+
+    filters = {'pk': card.pk}
+    if require_funds:
+        filters['saldo__gte'] = amount
+    if require_active:
+        filters['activo'] = True
+
+    updated = Card.objects.filter(**filters).update(
+        saldo=F('saldo') + delta,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        raise InsufficientFundsError('Fondos insuficientes')
+
+    # Leemos el saldo resultante dentro de la misma transacción
+    saldo_posterior = Card.objects.filter(pk=card.pk).values_list('saldo', flat=True).get()
+    card.saldo = saldo_posterior
+
+    return Transaction.objects.create(
+        card=card,
+        tipo=tipo,
+        monto=amount,
+        saldo_anterior=saldo_posterior - delta,
+        saldo_posterior=saldo_posterior,
+        descripcion=descripcion,
+        exitoso=True,
+    )
+
+
+@timed_stage(STAGE_DB_WRITE)
+def debit_card(card, amount, descripcion, tipo=Transaction.TransactionType.RETIRO, require_active=False):
+    """
+    Descuenta `amount` de la tarjeta y registra la transacción de forma atómica.
+
+    Lanza InsufficientFundsError si la tarjeta no tiene saldo suficiente (o,
+    con `require_active`, si no está activa). Actualiza `card.saldo` con el
+    saldo final.
+    """
+    with db_transaction.atomic():
+        if card.numero_tarjeta == CIENSPAY_MERCHANT_CARD:
+            # Los abonos aún repartidos en shards también cuentan como fondos
+            fold_merchant_ledger()
+        return _apply_movement(card, amount, -amount, tipo, descripcion,
+                               require_funds=True, require_active=require_active)
+
+
+def credit_card(card, amount, descripcion, tipo=Transaction.TransactionType.TRANSFERENCIA):
+    """
+    Abona `amount` a la tarjeta y registra la transacción de forma atómica.
+    Actualiza `card.saldo` con el saldo final.
+    """
+    with db_transaction.atomic():
+        return _apply_movement(card, amount, amount, tipo, descripcion, require_funds=False)
+
+
+def debit_batch(payments):
+    """
+    Procesa un lote de pagos con tarjetas CiensPay.
+
+    `payments` es una lista de dicts con `card_number`, `expiry_date`,
+    `amount` y `description`. Las tarjetas se leen con una sola consulta y se
+    actualizan en orden de id (orden determinista, sin deadlocks) con un
+    UPDATE por tarjeta relativo al saldo actual; todas las transacciones
+    se insertan con un único bulk_create. Los pagos aprobados se abonan a la
+    tarjeta comercio en un solo movimiento.
+
+    Devuelve una lista de resultados, uno por pago y en el mismo orden.
+    """
+    results = [None] * len(payments)
+    numbers = {str(p.get('card_number') or '').replace(' ', '') for p in payments}
+
+    with db_transaction.atomic():
+        cards = {
+            card.numero_tarjeta: card
+            for card in Card.objects.select_for_update()
+            .filter(numero_tarjeta__in=numbers)
+            .only('id', 'numero_tarjeta', 'saldo', 'activo', 'fecha_vencimiento')
+            .order_by('id')
+        }
+
+        # Saldos en curso por tarjeta y movimientos aceptados
+        running = {}
+        accepted = OrderedDict()  # card_id -> [(indice, pago, monto, saldo_anterior)]
+        for index, payment in enumerate(payments):
+            card = cards.get(str(payment.get('card_number') or '').replace(' ', ''))
+            if card is None:
+                results[index] = {'index': index, 'success': False, 'error': 'Tarjeta no encontrada'}
+                continue
+
+            error = validate_card_for_payment(card, payment.get('expiry_date'))
+            if error is None:
+                try:
+                    amount = parse_amount(payment.get('amount'))
+                except ValueError:
+                    error = 'Monto inválido (debe ser un entero positivo)'
+            if error is None:
+                saldo = running.get(card.pk, card.saldo)
+                if saldo < amount:
+                    error = 'Fondos insuficientes'
+            if error is not None:
+                results[index] = {'index': index, 'success': False, 'error': error}
+                continue
+
+            running[card.pk] = saldo - amount
+            accepted.setdefault(card.pk, []).append((index, payment, amount, saldo))
+
+        # Un UPDATE por tarjeta, en orden de id, relativo al saldo actual y
+        # condicionado a que cubra el total: en bases sin SELECT FOR UPDATE
+        # (SQLite) otro worker pudo cobrar la tarjeta después de la lectura.
+        by_id = {card.pk: card for card in cards.values()}
+        now = timezone.now()
+        movements = []
+        for card_id in sorted(accepted):
+            card, items = by_id[card_id], accepted[card_id]
+            total_card = sum(amount for _, _, amount, _ in items)
+            if not Card.objects.filter(pk=card_id, saldo__gte=total_card).update(
+                saldo=F('saldo') - total_card, updated_at=now
+            ):
+                for index, _, _, _ in items:
+                    results[index] = {'index': index, 'success': False, 'error': 'Fondos insuficientes'}
+                continue
+
+            # Saldos anteriores a partir del saldo real tras el UPDATE
+            saldo = Card.objects.filter(pk=card_id).values_list('saldo', flat=True).get() + total_card
+            for index, payment, amount, _ in items:
+                movements.append((card, (index, payment, amount, saldo)))
+                saldo -= amount
+
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                card=card,
+                tipo=Transaction.TransactionType.RETIRO,
+                monto=amount,
+                saldo_anterior=saldo,
+                saldo_posterior=saldo - amount,
+                descripcion=payment.get('description') or 'Pago en lote',
+                exitoso=True,
+            )
+            for card, (index, payment, amount, saldo) in movements
+        ])
+
+        for tx, (card, (index, _, amount, saldo)) in zip(transactions, movements):
+            results[index] = {
+                'index': index,
+                'success': True,
+                'transaction_id': tx.pk,
+                'new_balance': saldo - amount,
+            }
+
+        total = sum(amount for _, (_, _, amount, _) in movements)
+        if total:
+            credit_merchant(total, f'Pago en lote ({len(movements)} pagos)')
+
+    return results
+
+
+def _merchant_card():
+    return get_card_by_number(CIENSPAY_MERCHANT_CARD)
+
+
+def _merchant_balances(merchant):
+    """(saldo de la tarjeta, suma de shards) en una sola consulta"""
+    saldo, pending = (
+        Card.objects
+        .filter(pk=merchant.pk)
+        .annotate(pending=Sum('ledger_shards__saldo'))
+        .values_list('saldo', 'pending')
+        .get()
+    )
+    return saldo, pending or 0
+
+
+@timed_stage(STAGE_DB_WRITE)
+def credit_merchant(amount, descripcion):
+    """
+    Abona un pago liquidado a la tarjeta comercio de CiensPay.
+
+    El abono va a un shard elegido al azar (ver MerchantLedgerShard), no a la
+    fila de la tarjeta. El saldo registrado en la transacción es el que ve
+    esta transacción: saldo de la tarjeta más todos los shards.
+    """
+    merchant = _merchant_card()
+    shard = random.randrange(settings.MERCHANT_LEDGER_SHARDS)
+
+    with db_transaction.atomic():
+        shards = MerchantLedgerShard.objects.filter(card=merchant)
+        if not shards.filter(shard=shard).update(saldo=F('saldo') + amount):
+            MerchantLedgerShard.objects.get_or_create(card=merchant, shard=shard)
+            shards.filter(shard=shard).update(saldo=F('saldo') + amount)
+
+        saldo, pending = _merchant_balances(merchant)
+        saldo_posterior = saldo + pending
+
+        return Transaction.objects.create(
+            card=merchant,
+            tipo=Transaction.TransactionType.TRANSFERENCIA,
+            monto=amount,
+            saldo_anterior=saldo_posterior - amount,
+            saldo_posterior=saldo_posterior,
+            descripcion=descripcion,
+            exitoso=True,
+        )
+
+
+def fold_merchant_ledger():
+    """
+    Consolida los shards en el saldo de la tarjeta comercio.
+
+    Cada shard se descuenta por el importe leído (no se pone a 0), de modo que
+    los abonos que lleguen mientras tanto no se pierden. Devuelve el total
+    traspasado.
+    """
+    merchant = _merchant_card()
+    folded = 0
+
+    with db_transaction.atomic():
+        shards = MerchantLedgerShard.objects.filter(card=merchant).exclude(saldo=0)
+        for shard_id, saldo in shards.values_list('id', 'saldo'):
+            MerchantLedgerShard.objects.filter(pk=shard_id).update(saldo=F('saldo') - saldo)
+            folded += saldo
+
+        if folded:
+            Card.objects.filter(pk=merchant.pk).update(
+                saldo=F('saldo') + folded,
+                updated_at=timezone.now(),
+            )
+
+    return folded
@@ -0,0 +1,131 @@
+"""
+Liquidación asíncrona de pagos con bancos externos (patrón outbox).
+
+La vista descuenta la tarjeta y encola la liquidación en la misma transacción
+de base de datos y responde de inmediato. El comando `process_settlements`
+drena la cola: envía cada entrada al banco mediante su conector, reintenta
+con backoff exponencial los errores de red y las respuestas 5xx y, si se
+agotan los intentos o el banco rechaza la operación (4xx), reembolsa el
+descuento.
+"""
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .banks import get_connector
+from .metrics import STAGE_DB_WRITE, timed_stage
+from .models import SettlementOutbox, Transaction
+from .services import credit_card, debit_card
+
+
+@timed_stage(STAGE_DB_WRITE)
+def debit_and_enqueue(card, amount, descripcion, bank_identifier, metodo, ruta, payload):
+    """
+    Descuenta la tarjeta y encola la liquidación externa de forma atómica.
+    Devuelve la entrada del outbox creada.
+    """
+    with db_transaction.atomic():
+        debit = debit_card(card, amount, descripcion, require_active=True)
+        return SettlementOutbox.objects.create(
+            banco=bank_identifier,
+            metodo=metodo,
+            ruta=ruta,
+            payload=payload,
+            card=card,
+            transaction=debit,
+            monto=amount,
+        )
+
+
+def _claim_batch(batch_size):
+    """
+    Reserva hasta `batch_size` entradas listas para enviarse.
+
+    La reserva es un UPDATE condicional sobre (estado, updated_at), de modo que
+    varios workers pueden drenar la cola a la vez sin enviar dos veces la
+    misma entrada. Las entradas PROCESANDO cuyo worker murió se recuperan al
+    vencer SETTLEMENT_LEASE_SECONDS.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.SETTLEMENT_LEASE_SECONDS)
+    candidates = (
+        SettlementOutbox.objects
+        .filter(
+            Q(estado=SettlementOutbox.Status.PENDIENTE, proximo_intento__lte=now) |
+            Q(estado=SettlementOutbox.Status.PROCESANDO, updated_at__lt=lease_expired)
+        )
+        .order_by('proximo_intento')
+        .values_list('id', 'estado', 'updated_at')[:batch_size]
+    )
+
+    claimed = []
+    for entry_id, estado, updated_at in candidates:
+        won = SettlementOutbox.objects.filter(
+            pk=entry_id, estado=estado, updated_at=updated_at
+        ).update(estado=SettlementOutbox.Status.PROCESANDO, updated_at=now)
+        if won:
+            claimed.append(entry_id)
+    return SettlementOutbox.objects.filter(pk__in=claimed).select_related('card')
+
+
+def _send(entry):
+    connector = get_connector(entry.banco)
+    response = connector.request(entry.metodo, entry.ruta, entry.payload)
+    response.raise_for_status()
+    return response
+
+
+def _is_permanent(error):
+    """Un 4xx es un rechazo del banco: reintentar devolvería lo mismo"""
+    response = getattr(error, 'response', None)
+    return response is not None and 400 <= response.status_code < 500
+
+
+def _mark_failed_attempt(entry, error, permanent=False):
+    entry.intentos += 1
+    entry.ultimo_error = error[:2000]
+
+    if permanent or entry.intentos >= settings.SETTLEMENT_MAX_ATTEMPTS:
+        # Sin más reintentos: devolver el dinero al cliente
+        with db_transaction.atomic():
+            credit_card(entry.card, entry.monto, 'Reverso por liquidación fallida',
+                        tipo=Transaction.TransactionType.REEMBOLSO)
+            entry.estado = SettlementOutbox.Status.FALLIDO
+            entry.save(update_fields=['estado', 'intentos', 'ultimo_error', 'updated_at'])
+        return
+
+    backoff = settings.SETTLEMENT_RETRY_BASE_SECONDS * (2 ** (entry.intentos - 1))
+    entry.estado = SettlementOutbox.Status.PENDIENTE
+    entry.proximo_intento = timezone.now() + timedelta(seconds=backoff)
+    entry.save(update_fields=['estado', 'intentos', 'ultimo_error', 'proximo_intento', 'updated_at'])
+
+
+def process_pending(batch_size=50):
+    """
+    Envía un lote de liquidaciones pendientes.
+    Devuelve un dict con el número de entradas enviadas, reintentadas y fallidas.
+    """
+    result = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    for entry in _claim_batch(batch_size):
+        try:
+            _send(entry)
+        except requests.exceptions.RequestException as e:
+            _mark_failed_attempt(entry, str(e), permanent=_is_permanent(e))
+            if entry.estado == SettlementOutbox.Status.FALLIDO:
+                result['failed'] += 1
+            else:
+                result['retried'] += 1
+            continue
+
+        entry.intentos += 1
+        entry.estado = SettlementOutbox.Status.ENVIADO
+        entry.ultimo_error = None
+        entry.save(update_fields=['estado', 'intentos', 'ultimo_error', 'updated_at'])
+        result['sent'] += 1
+
+    return result
@@ -0,0 +1,80 @@
+"""
+Servidores HTTP locales que imitan a los bancos externos (CreditBank,
+Bancobsidiana) y al endpoint de saldo de CiensPay. Los usa el comando
+`bench_payments` para medir el flujo de pagos sin salir de la máquina.
+
+Cada stub responde 200 con JSON a cualquier POST/PATCH tras una latencia
+configurable, y devuelve 500 con la probabilidad `error_rate`.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBankServer:
+    """Banco simulado escuchando en 127.0.0.1:`port` (0 = puerto libre)"""
+
+    def __init__(self, name, port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, como un banco real
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+
+                delay = stub.latency_ms + random.uniform(0, stub.jitter_ms)
+                if delay:
+                    time.sleep(delay / 1000)
+
+                failed = random.random() < stub.error_rate
+                with stub._lock:
+                    stub.requests += 1
+                    stub.errors += failed
+
+                code = 500 if failed else 200
+                body = json.dumps({
+                    'success': not failed,
+                    'bank': stub.name,
+                    'message': 'Error simulado' if failed else 'Operación simulada',
+                }).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_POST = _handle
+            do_PATCH = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
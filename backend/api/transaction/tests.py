@@ -0,0 +1,102 @@
+import threading
+from datetime import timedelta
+
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from api.card.cache import card_cache
+from api.card.models import Card
+from api.users.models import User
+from .models import Transaction
+from .services import CIENSPAY_MERCHANT_CARD, debit_batch
+from .view import _financial_data_etag
+
+
+def create_user(n):
+    return User.objects.create(
+        document_type='CC', document_number=f'doc-{n}', full_name=f'Usuario {n}',
+        email=f'usuario{n}@example.com', password='x',
+    )
+
+
+def create_card(user, numero, saldo):
+    return Card.objects.create(
+        numero_tarjeta=numero, saldo=saldo, activo=True, user=user,
+        fecha_vencimiento=timezone.now() + timedelta(days=365),
+    )
+
+
+def payment(card, amount):
+    return {
+        'card_number': card.numero_tarjeta,
+        'expiry_date': card.fecha_vencimiento.strftime('%m/%y'),
+        'cvv': '123',
+        'amount': amount,
+        'description': 'Pago de prueba',
+    }
+
+
+class DebitBatchConcurrencyTests(TransactionTestCase):
+    """Lotes simultáneos sobre las mismas tarjetas (SQLite en fichero)"""
+    THREADS = 8
+    BATCHES = 5
+    INITIAL = 1000
+
+    def setUp(self):
+        card_cache.clear()
+        create_card(create_user(0), CIENSPAY_MERCHANT_CARD, 0)
+        self.cards = [
+            create_card(create_user(i), f'46510000000000{i:02d}', self.INITIAL)
+            for i in range(1, 5)
+        ]
+
+    def test_concurrent_batches_do_not_fail(self):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.BATCHES):
+                    results = debit_batch([payment(card, 1) for card in self.cards])
+                    errors.extend(r['error'] for r in results if not r['success'])
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        charged = self.THREADS * self.BATCHES
+        for card in self.cards:
+            card.refresh_from_db()
+            self.assertEqual(card.saldo, self.INITIAL - charged)
+        self.assertEqual(
+            Transaction.objects.filter(tipo=Transaction.TransactionType.RETIRO).count(),
+            charged * len(self.cards),
+        )
+
+
+class FinancialDataETagTests(TestCase):
+    def setUp(self):
+        self.user = create_user(1)
+        self.card = create_card(self.user, '4651000000000001', 1000)
+        self.request = RequestFactory().get(f'/api/users/{self.user.id}/financial-data/')
+
+    def test_single_query_and_changes_with_new_transaction(self):
+        with self.assertNumQueries(1):
+            before = _financial_data_etag(self.request, self.user)
+
+        # Solo una transacción nueva: la tarjeta y el usuario no cambian
+        Transaction.objects.create(
+            card=self.card, tipo=Transaction.TransactionType.DEPOSITO, monto=10,
+            saldo_anterior=1000, saldo_posterior=1010, exitoso=True,
+        )
+
+        with self.assertNumQueries(1):
+            after = _financial_data_etag(self.request, self.user)
+        self.assertNotEqual(before, after)
@@ -6,6 +6,11 @@ from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.hashers import check_password
@@ -15,14 +20,32 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from api.users.models import User
+from api.card.cache import get_card_by_number, invalidate_card
 from api.card.models import Card
-from api.card.serializer import CardSerializer
-from datetime import datetime
-import pytz
+from api.admin_views import IsAdmin
+from api.pagination import KeysetPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer
+from api.card.serializer import CardSummarySerializer
+from datetime import date, datetime
+import hashlib
 from django.conf import settings
 import requests
-from .models import Transaction 
+from .models import CardDailyBalance, Transaction
 from .serializer import TransactionSerializer, TransactionCreateSerializer
+from .fastpath import FastJSONRenderer, serialize_transactions, transaction_values
+from .export import CONTENT_TYPES, EXPORT_FORMATS, filter_transactions, iter_export
+from .search import search_transactions
+from .archive import archive_source
+from .rollups import monthly_spending, transaction_count
+from .idempotency import idempotent
+from .metrics import STAGE_CARD_LOOKUP, STAGE_VALIDATION, instrumented_payment, registry, stage
+from .banks import BANCOBSIDIANA, CIENSPAY, CREDITBANK, route_payment
+from .services import (
+    InsufficientFundsError, credit_card, credit_merchant, debit_batch, debit_card, parse_amount,
+    validate_card_for_payment,
+)
+from .settlement import debit_and_enqueue
 
 import json
 
@@ -43,22 +66,94 @@ def transaction_list(request):
     
 
 class TransactionListAPIView(generics.ListCreateAPIView):
+    """
+    GET: historial paginado por cursor sobre (fecha_operacion, id), del más
+    reciente al más antiguo. Filtros opcionales: ?card=<id>&user=<id>.
+    Parámetros de página: ?cursor=...&page_size=50 (máx. 200).
+    """
     queryset = Transaction.objects.select_related('card').all()
+    pagination_class = KeysetPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return TransactionCreateSerializer
         return TransactionSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return self._filter(queryset)
+
+    def _filter(self, queryset):
+        card_id = self.request.query_params.get('card')
+        user_id = self.request.query_params.get('user')
+        try:
+            if card_id:
+                queryset = queryset.filter(card_id=int(card_id))
+            if user_id:
+                queryset = queryset.filter(card__user_id=int(user_id))
+        except ValueError:
+            raise ValidationError({'error': 'card y user deben ser enteros'})
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Camino rápido: values() + dicts con la misma forma que TransactionSerializer
+        queryset = transaction_values(self.get_queryset())
+        archive = archive_source(lambda qs: transaction_values(self._filter(qs)))
+        rows = self.paginator.paginate_queryset(queryset, request, view=self, archive=archive)
+        return self.get_paginated_response(serialize_transactions(rows))
     
     def transaction_list(self):
         # select_related hace el JOIN en la consulta SQL
         return Transaction.objects.select_related('card').all()
     
 
+def _financial_data_etag(request, user):
+    """
+    Versión barata de financial-data: cambia si hay una transacción nueva, si
+    se modifica o se añade una tarjeta del usuario, si cambia el usuario o si
+    cambia la URL (cursor, page_size). Una sola consulta agregada.
+    """
+    # ORDER BY id DESC LIMIT 1 es una búsqueda en el índice de card; un
+    # GROUP BY con MAX recorrería todas las transacciones de la tarjeta
+    last_tx = (
+        Transaction.objects
+        .filter(card=OuterRef('pk'))
+        .order_by('-id')
+        .values('id')[:1]
+    )
+    version = Card.objects.filter(user_id=user.id).aggregate(
+        total=Count('id'),
+        updated=Max('updated_at'),
+        last_tx=Max(Subquery(last_tx)),
+    )
+    raw = '|'.join(str(value) for value in (
+        user.id, user.updated_at, version['total'], version['updated'],
+        version['last_tx'], request.build_absolute_uri(),
+    ))
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def _etag_matches(request, etag):
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    # Comparación débil: W/"x" equivale a "x"
+    return '*' in etags or etag in (e.removeprefix('W/') for e in etags)
+
+
 class UserCardsTransactionsAPIView(APIView):
     """
-    API para obtener todas las tarjetas y transacciones de un usuario
+    API para obtener todas las tarjetas y transacciones de un usuario.
+
+    Las transacciones vienen paginadas por cursor (más recientes primero):
+    ?cursor=...&page_size=50. El resumen se calcula con una sola consulta.
+
+    La respuesta lleva un ETag; si el cliente lo envía en If-None-Match y
+    nada ha cambiado, se responde 304 sin recalcular. El cuerpo se guarda en
+    caché bajo ese ETag durante FINANCIAL_DATA_CACHE_TTL segundos.
     """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     
     def get(self, request, user_id=None):
         # Si no se proporciona user_id, usar el usuario autenticado
@@ -71,20 +166,56 @@ class UserCardsTransactionsAPIView(APIView):
             )
         
         # Verificar que el usuario exista
-        user = get_object_or_404(User, id=user_id)
+        user = get_object_or_404(
+            User.objects.only('id', 'username', 'email', 'full_name', 'updated_at'), id=user_id
+        )
+        
+        etag = _financial_data_etag(request, user)
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+        
+        cache_key = f'financial-data:{etag}'
+        response_data = cache.get(cache_key)
+        if response_data is None:
+            response_data = self._build(request, user)
+            if settings.FINANCIAL_DATA_CACHE_TTL > 0:
+                cache.set(cache_key, response_data, settings.FINANCIAL_DATA_CACHE_TTL)
+        
+        response = Response(response_data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        # El navegador puede guardarla, pero debe revalidar siempre
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    def _build(self, request, user):
+        user_id = user.id
         
         # Obtener todas las tarjetas del usuario
-        cards = Card.objects.filter(user=user_id).select_related('user')
+        cards = list(Card.objects.filter(user_id=user_id).order_by('id'))
+        card_ids = [card.id for card in cards]
         
-        # Obtener todas las transacciones de las tarjetas del usuario
-        card_ids = cards.values_list('id', flat=True)
-        transactions = Transaction.objects.filter(
-            card_id__in=card_ids
-        ).select_related('card').order_by('-fecha_operacion')
+        # Resumen en una sola consulta agregada; el número de transacciones
+        # sale del agregado diario (ver rollups.transaction_count)
+        archive = archive_source(lambda qs: transaction_values(qs.filter(card_id__in=card_ids)))
+        summary = Card.objects.filter(user_id=user_id).aggregate(
+            total_cards=Count('id'),
+            total_transactions=Coalesce(Sum(transaction_count()), 0),
+            total_balance=Coalesce(Sum('saldo', filter=Q(activo=True)), 0),
+        )
+        
+        # Página de transacciones (usa el índice card, -fecha_operacion)
+        paginator = KeysetPagination()
+        transactions = paginator.paginate_queryset(
+            transaction_values(Transaction.objects.filter(card_id__in=card_ids)),
+            request,
+            archive=archive,
+        )
         
         # Serializar los datos
-        cards_data = CardSerializer(cards, many=True).data
-        transactions_data = TransactionSerializer(transactions, many=True).data
+        cards_data = CardSummarySerializer(cards, many=True).data
+        transactions_data = serialize_transactions(transactions)
         
         # Estructurar la respuesta
         response_data = {
@@ -96,18 +227,18 @@ class UserCardsTransactionsAPIView(APIView):
             },
             "cards": cards_data,
             "transactions": transactions_data,
-            "summary": {
-                "total_cards": cards.count(),
-                "total_transactions": transactions.count(),
-                "total_balance": sum(card.saldo for card in cards if card.activo)
-            }
+            "transactions_next": paginator.get_next_link(),
+            "transactions_next_cursor": paginator.next_cursor,
+            "summary": summary
         }
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return response_data
 
 class SimulatePaymentAPIView(APIView):
     permission_classes = [AllowAny]  # Permitir acceso sin autenticación para el simulador
 
+    @idempotent
+    @instrumented_payment
     def post(self, request):
         button_bank_external = request.data.get('button_bank_external')
         bank_identifier = request.data.get('bank_identifier')
@@ -124,51 +255,36 @@ class SimulatePaymentAPIView(APIView):
             return Response({'error': 'Todos los campos son requeridos'}, status=status.HTTP_400_BAD_REQUEST)
     
         try:
-            amount = float(amount)
-            if amount <= 0:
-                raise ValueError
+            amount = parse_amount(amount)
         except ValueError:
-            return Response({'error': 'Monto inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'Monto inválido (debe ser un entero positivo)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Banco destino: por identificador o, si no se reconoce, por BIN
+        connector = route_payment(bank_identifier, card_number)
+        bank = connector.name if connector else None
 
         card= None
 
         # 1. Validar tarjeta
         try:
-            card = Card.objects.get(numero_tarjeta=card_number.replace(" ", ""))
+            # Metadatos desde la caché; el saldo se comprueba en el UPDATE del cargo
+            with stage(STAGE_CARD_LOOKUP):
+                card = get_card_by_number(card_number.replace(" ", ""))
         except Card.DoesNotExist:
-            if bank_identifier in [ 'cienspay', '4651', 'grupo2'] or button_bank_external == True:
+            if bank == CIENSPAY or button_bank_external == True:
                 return Response({'error': 'Tarjeta no encontrada'}, status=status.HTTP_404_NOT_FOUND)
 
-        if button_bank_external == True  or (button_bank_external == False and bank_identifier in [ 'cienspay', '4651', 'grupo2']):
+        if button_bank_external == True  or (button_bank_external == False and bank == CIENSPAY):
            
-            if not card.activo:
-                return Response({'error': 'La tarjeta no está activa'}, status=status.HTTP_400_BAD_REQUEST)
-
-
-            # 2. Validar fecha de vencimiento
-            # Asumiendo que expiry_date viene como "MM/YY"
-            try:
-                exp_month, exp_year = map(int, expiry_date.split('/'))
-                # Convertir año de 2 dígitos a 4 (asumiendo 20xx)
-                exp_year += 2000
-                
-                # Obtener el último día del mes de vencimiento para comparar con la fecha de la base de datos
-                # O simplemente comparar mes y año si fecha_vencimiento es solo fecha
-                if card.fecha_vencimiento:
-                    if card.fecha_vencimiento.year != exp_year or card.fecha_vencimiento.month != exp_month:
-                        return Response({'error': 'Fecha de vencimiento incorrecta'}, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    # Verificar si ya venció (opcional, dependiendo de si se bloquean transacciones)
-                    now = datetime.now(pytz.UTC)
-                    if card.fecha_vencimiento < now:
-                        return Response({'error': 'La tarjeta ha expirado'}, status=status.HTTP_400_BAD_REQUEST)
-
-            except ValueError:
-                return Response({'error': 'Formato de fecha de vencimiento inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            # 2. Validar estado y fecha de vencimiento (formato "MM/YY")
+            with stage(STAGE_VALIDATION):
+                error = validate_card_for_payment(card, expiry_date)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-            # 3. Validar saldo
-            if card.saldo < amount:
-                return Response({'error': 'Fondos insuficientes'}, status=status.HTTP_400_BAD_REQUEST)
+            # 3. El saldo (y que siga activa) se valida en el propio descuento,
+            #    con un UPDATE condicional que es la comprobación autoritativa
 
         # 4. Procesar pago
         try:
@@ -176,175 +292,102 @@ class SimulatePaymentAPIView(APIView):
  # 5. Lógica de Banco Externo
             if button_bank_external is True: # si es un boton de pago externo
 
-                saldo_anterior = card.saldo
-                card.saldo -= amount
-                card.save()
-                
-                Transaction.objects.create(
-                    card=card,
-                    tipo=Transaction.TransactionType.RETIRO, # O 'COMPRA' si existiera
-                    monto=amount,
-                    saldo_anterior=saldo_anterior,
-                    saldo_posterior=card.saldo,
-                    descripcion=description,
-                    exitoso=True
-                )
-                    
-
-                    
-                if bank_identifier in ['creditbank', 'grupo3']:
-                    
-                    return Response({
-                        'success': True, 
-                        'message': 'grupo3 - CreditBank',
-                        'new_balance': card.saldo
-                    }, status=status.HTTP_200_OK)
-                    url = 'https://core-banking-service-6pup.onrender.com/external/transfer-in'
-                    
+                if bank == CREDITBANK:
+                    message = 'grupo3 - CreditBank'
+                    metodo, ruta = 'PATCH', 'external/transfer-in'
                     payload = {
                         "amount": amount,
                         "target_account_number": "1234567890",
                         "external_bank_name": f"{bank_identifier} cienspay",
                         "external_card_number": card_number
                     }
-
-                    print(f"Enviando a API externa: {url}")
-                    print(f"Payload: {payload}")
-                    
+                elif bank == BANCOBSIDIANA:
+                    # Este banco exige el CVV, que no se persiste en el outbox:
+                    # se liquida en línea y el descuento se revierte si falla
                     try:
-                        
-                        response = requests.patch(url, json=payload, timeout=30)  # Método PATCH para el endpoint de balance
-                        print(f"Respuesta status: {response.status_code}")
-                        print(f"Respuesta contenido: {response.text}")
-                        
-                        response.raise_for_status()
-                        return Response(response.json(), status=status.HTTP_200_OK)
+                        debit_card(card, amount, description, require_active=True)
+                    except InsufficientFundsError:
+                        invalidate_card(card)
+                        return Response({'error': 'Fondos insuficientes'}, status=status.HTTP_400_BAD_REQUEST)
 
-                    except requests.exceptions.RequestException as e:
-                        print(f"Error en petición externa: {str(e)}")
-                        # Aquí deberías hacer ROLLBACK de la transacción
-                        # Revertir el descuento de la tarjeta
-                        card.saldo += amount
-                        card.save()
-                        
-                        return Response({
-                            'error': f'Error en comunicación bancaria: {str(e)}'
-                        }, status=status.HTTP_502_BAD_GATEWAY)
-                elif bank_identifier in [ 'grupo5' , 'bancobsidiana']:
-                    return Response({
-                        'success': True, 
-                        'message': 'grupo5 - bancobsidiana',
-                        'new_balance': card.saldo
-                    }, status=status.HTTP_200_OK)
-                    url = 'https://bancobsidiana.up.railway.app/api/v1/transaction/process'
-                    #url = 'https://ecommerce-bancobsidiana-team5-production.up.railway.app/api/v1/transaction/process'
-                    
                     payload = {
-                         "card_number": card_number,
+                        "card_number": card_number,
                         "expiry": expiry_date,
                         "cvv": cvv,
                         "amount": amount,
                         "merchant_id": "t3ch-pr0",
                         "description": description,
-                        "destination_account": "1234567890" 
+                        "destination_account": "1234567890"
                     }
-
-
-                    print(f"Enviando a API externa: {url}")
-                    print(f"Payload: {payload}")
-                    
                     try:
-                        
-                        response = requests.post(url, json=payload, timeout=30)  # Método PATCH para el endpoint de balance
-                        print(f"Respuesta status: {response.status_code}")
-                        print(f"Respuesta contenido: {response.text}")
-                        
+                        response = connector.post('api/v1/transaction/process', payload)
                         response.raise_for_status()
-                        return Response(response.json(), status=status.HTTP_200_OK)
-
                     except requests.exceptions.RequestException as e:
                         print(f"Error en petición externa: {str(e)}")
-                        # Aquí deberías hacer ROLLBACK de la transacción
-                        # Revertir el descuento de la tarjeta
-                        card.saldo += amount
-                        card.save()
-                        
+                        credit_card(card, amount, 'Reverso por liquidación fallida',
+                                    tipo=Transaction.TransactionType.REEMBOLSO)
                         return Response({
                             'error': f'Error en comunicación bancaria: {str(e)}'
                         }, status=status.HTTP_502_BAD_GATEWAY)
 
                     return Response({
-                        'success': True, 
-                        'message': 'grupo5',
+                        'success': True,
+                        'message': 'grupo5 - bancobsidiana',
                         'new_balance': card.saldo
                     }, status=status.HTTP_200_OK)
                 else:       
                     return Response({
                         'error': 'Banco no encontrado'
                     }, status=status.HTTP_404_NOT_FOUND)
+
+                # Descuento + liquidación encolada en una sola transacción.
+                # El envío al banco lo hace `manage.py process_settlements`.
+                try:
+                    debit_and_enqueue(card, amount, description, bank, metodo, ruta, payload)
+                except InsufficientFundsError:
+                    invalidate_card(card)
+                    return Response({'error': 'Fondos insuficientes'}, status=status.HTTP_400_BAD_REQUEST)
+
+                return Response({
+                    'success': True, 
+                    'message': message,
+                    'new_balance': card.saldo
+                }, status=status.HTTP_200_OK)
             
             if button_bank_external is False:
-                if bank_identifier in [ 'cienspay', '4651', 'grupo2']:
-                    
-                    saldo_anterior = card.saldo
-                    card.saldo -= amount
-                    card.save()
-                    
-                    Transaction.objects.create(
-                        card=card,
-                        tipo=Transaction.TransactionType.RETIRO, # O 'COMPRA' si existiera
-                        monto=amount,
-                        saldo_anterior=saldo_anterior,
-                        saldo_posterior=card.saldo,
-                        descripcion=description,
-                        exitoso=True
-                    )
-                    url = f"{settings.CIENSPAY_API_URL}/cards/14/balance/"
+                if bank == CIENSPAY:
                     
+                    try:
+                        debit_card(card, amount, description, require_active=True)
+                    except InsufficientFundsError:
+                        invalidate_card(card)
+                        return Response({'error': 'Fondos insuficientes'}, status=status.HTTP_400_BAD_REQUEST)
+
                     payload = {
                         "balance":amount ,
                     }
 
                     try:
-                        
-                        response = requests.patch(url, json=payload, timeout=30)  # Método PATCH para el endpoint de balance
+                        response = connector.patch('cards/14/balance/', payload)  # Método PATCH para el endpoint de balance
                         print(f"Respuesta status: {response.status_code}")
                         print(f"Respuesta contenido: {response.text}")
-                        card_cienspay = Card.objects.get(numero_tarjeta= '4651001855562775')
-                        Transaction.objects.create(
-                        card=card_cienspay,
-                        tipo=Transaction.TransactionType.TRANSFERENCIA, # O 'COMPRA' si existiera
-                        saldo_anterior=card_cienspay.saldo,
-                        monto=amount,
-                        saldo_posterior=card_cienspay.saldo + amount,
-                        descripcion='tRANSFERENCIA EXITOSA',
-                        exitoso=True
-                    )
-                        
-                        card_cienspay.saldo += amount
-                        card_cienspay.save()
-                        
                         response.raise_for_status()
-                        return Response(response.json(), status=status.HTTP_200_OK)
-
+                        data = response.json()
                     except requests.exceptions.RequestException as e:
                         print(f"Error en petición externa: {str(e)}")
-                        # Aquí deberías hacer ROLLBACK de la transacción
-                        # Revertir el descuento de la tarjeta
-                      
+                        # Revertir el descuento: el comercio aún no recibió el abono
+                        credit_card(card, amount, 'Reverso por liquidación fallida',
+                                    tipo=Transaction.TransactionType.REEMBOLSO)
                         return Response({
                             'error': f'Error en comunicación bancaria: {str(e)}'
                         }, status=status.HTTP_502_BAD_GATEWAY)
 
-                    return Response({
-                        'success': True, 
-                        'message': 'Pago realizado con éxito',
-                        'new_balance': card.saldo
-                    }, status=status.HTTP_200_OK)
+                    credit_merchant(amount, 'tRANSFERENCIA EXITOSA')
+                    return Response(data, status=status.HTTP_200_OK)
 
-                elif bank_identifier in ['creditbank', 'grupo3']:
+                elif bank == CREDITBANK:
                     # Lógica para CreditBank/Grupo3
-                    url = 'https://core-banking-service-6pup.onrender.com/api/external/verify-and-charge'
+                    url = connector.url('api/external/verify-and-charge')
                     
                     payload = {
                         "card_number": card_number,
@@ -357,25 +400,13 @@ class SimulatePaymentAPIView(APIView):
                     print(f"Payload: {payload}")
                     
                     try:
-                        response = requests.post(url, json=payload, timeout=30)
+                        response = connector.post('api/external/verify-and-charge', payload)
                         print(f"Respuesta status: {response.status_code}")
                         print(f"Respuesta contenido: {response.text}")
                         
                         response.raise_for_status()
                         
-                        card_cienspay = Card.objects.get(numero_tarjeta= '4651001855562775')
-                        Transaction.objects.create(
-                        card=card_cienspay,
-                        tipo=Transaction.TransactionType.TRANSFERENCIA, # O 'COMPRA' si existiera
-                        saldo_anterior=card_cienspay.saldo,
-                        monto=amount,
-                        saldo_posterior=card_cienspay.saldo + amount,
-                        descripcion='TRANSFERENCIA EXITOSA',
-                        exitoso=True
-                        )
-                        
-                        card_cienspay.saldo += amount
-                        card_cienspay.save()
+                        credit_merchant(amount, 'TRANSFERENCIA EXITOSA')
                         
                         response.raise_for_status()
                         return Response(response.json(), status=status.HTTP_200_OK)
@@ -390,13 +421,14 @@ class SimulatePaymentAPIView(APIView):
 
                     except requests.exceptions.RequestException as e:
                         print(f"Error en petición externa a {bank_identifier}: {str(e)}")
-                        # ROLLBACK: revertir el descuento de la tarjeta
-                        card.saldo += amount
-                        card.save()
+                        # No hubo descuento local: el cargo lo hace el banco externo
+                        return Response({
+                            'error': f'Error en comunicación bancaria: {str(e)}'
+                        }, status=status.HTTP_502_BAD_GATEWAY)
 
-                elif bank_identifier in [ 'grupo5' , 'bancobsidiana']:
+                elif bank == BANCOBSIDIANA:
                     # Lógica para CreditBank/Grupo3
-                    url = 'https://bancobsidiana.up.railway.app/api/v1/transaction/process'
+                    url = connector.url('api/v1/transaction/process')
                     #url = 'https://ecommerce-bancobsidiana-team5-production.up.railway.app/api/v1/transaction/process'
 
                     payload = {
@@ -412,26 +444,14 @@ class SimulatePaymentAPIView(APIView):
                     print(f"Payload: {payload}")
                     
                     try:
-                        response = requests.post(url, json=payload, timeout=30)
+                        response = connector.post('api/v1/transaction/process', payload)
                         print(f"Respuesta status: {response.status_code}")
                         print(f"Respuesta contenido: {response.text}")
                         
                         response.raise_for_status()
 
-                        card_cienspay = Card.objects.get(numero_tarjeta= '4651001855562775')
-                        # Si la respuesta es exitosa, crear la transacción local
-                        Transaction.objects.create(
-                            card=card_cienspay,
-                            tipo=Transaction.TransactionType.TRANSFERENCIA,
-                            saldo_anterior=card_cienspay.saldo,
-                            monto=amount,
-                            saldo_posterior=card_cienspay.saldo + amount,
-                            descripcion=f"Transferencia de {amount} del banco {bank_identifier}",
-                            exitoso=True
-                            
-                        )
-                        card_cienspay.saldo += amount
-                        card_cienspay.save()
+                        # Si la respuesta es exitosa, abonar al comercio
+                        credit_merchant(amount, f"Transferencia de {amount} del banco {bank_identifier}")
                         
                         return Response({
                             'success': True,
@@ -452,6 +472,168 @@ class SimulatePaymentAPIView(APIView):
         #    return Response({'error': 'Banco no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 
+
+class BatchPaymentAPIView(APIView):
+    """
+    Pagos en lote con tarjetas CiensPay.
+
+    Body: {"payments": [{"card_number", "expiry_date", "cvv", "amount", "description"}, ...]}
+    Devuelve un resultado por pago, en el mismo orden.
+    """
+    permission_classes = [AllowAny]  # Igual que el simulador de pagos
+
+    @idempotent
+    def post(self, request):
+        payments = request.data.get('payments')
+        if not isinstance(payments, list) or not payments:
+            return Response({'error': 'Se requiere una lista de pagos'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(payments) > settings.BATCH_PAYMENT_MAX_ITEMS:
+            return Response({
+                'error': f'Máximo {settings.BATCH_PAYMENT_MAX_ITEMS} pagos por lote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not all(isinstance(p, dict) and p.get('cvv') for p in payments):
+            return Response({'error': 'Cada pago requiere sus datos completos'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = debit_batch(payments)
+        approved = sum(1 for r in results if r['success'])
+
+        return Response({
+            'success': approved > 0,
+            'approved': approved,
+            'rejected': len(results) - approved,
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdmin])
+def payment_metrics(request):
+    """
+    GET: histogramas de latencia por etapa del simulador de pagos
+    (etiquetas: stage, bank, outcome). DELETE: reinicia los contadores.
+    Los valores son del worker que atiende la petición.
+    """
+    if request.method == 'DELETE':
+        registry.reset()
+        return Response({'success': True, 'message': 'Métricas reiniciadas'})
+
+    return Response({'success': True, **registry.snapshot()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export_transactions(request):
+    """
+    Exporta el historial en streaming.
+
+    Query params:
+    - formato: ndjson (default) o csv
+    - card: id de tarjeta
+    - desde / hasta: fecha (YYYY-MM-DD, inclusiva) o fecha-hora ISO
+    - tipo: DEP, RET, TRA o REE
+    """
+    formato = request.query_params.get('formato', 'ndjson')
+    if formato not in EXPORT_FORMATS:
+        return Response({'error': f'Formato inválido, use: {", ".join(EXPORT_FORMATS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    filters = {
+        'card': request.query_params.get('card'),
+        'desde': request.query_params.get('desde'),
+        'hasta': request.query_params.get('hasta'),
+        'tipo': request.query_params.get('tipo'),
+    }
+    try:
+        queryset = filter_transactions(**filters)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    archive = archive_source(lambda qs: filter_transactions(**filters, queryset=qs), filters['desde'])
+    rows = iter_export(queryset, formato, archive=archive.queryset if archive else None)
+    response = StreamingHttpResponse(rows, content_type=CONTENT_TYPES[formato])
+    response['Content-Disposition'] = f'attachment; filename="transacciones.{formato}"'
+    return response
+
+
+class TransactionSearchAPIView(generics.ListAPIView):
+    """
+    Búsqueda para soporte, paginada por cursor (más recientes primero).
+
+    Query params (todos opcionales y combinables):
+    - tipo: DEP, RET, TRA o REE
+    - exitoso: true / false
+    - monto_min / monto_max: rango de monto, inclusivo
+    - desde / hasta: fecha (YYYY-MM-DD, inclusiva) o fecha-hora ISO
+    - card: id de tarjeta
+    - q: texto de la descripción (cada palabra como prefijo)
+    - cursor / page_size (máx. 200)
+    """
+    permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_queryset(self, queryset=None):
+        try:
+            return search_transactions(self.request.query_params, queryset)
+        except ValueError as e:
+            raise ValidationError({'error': str(e)})
+
+    def list(self, request, *args, **kwargs):
+        queryset = transaction_values(self.get_queryset())
+        archive = archive_source(
+            lambda qs: transaction_values(self.get_queryset(qs)), request.query_params.get('desde')
+        )
+        rows = self.paginator.paginate_queryset(queryset, request, view=self, archive=archive)
+        return self.get_paginated_response(serialize_transactions(rows))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def card_daily_balances(request, card_id):
+    """
+    Resumen diario de una tarjeta (tabla card_daily_balances).
+    Query params opcionales: desde / hasta (YYYY-MM-DD, inclusivos).
+    """
+    queryset = CardDailyBalance.objects.filter(card_id=card_id)
+    try:
+        if request.query_params.get('desde'):
+            queryset = queryset.filter(dia__gte=date.fromisoformat(request.query_params['desde']))
+        if request.query_params.get('hasta'):
+            queryset = queryset.filter(dia__lte=date.fromisoformat(request.query_params['hasta']))
+    except ValueError:
+        return Response({'error': 'Fechas en formato YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = list(queryset.order_by('dia').values(
+        'dia', 'saldo_apertura', 'saldo_cierre', 'total_debitos',
+        'total_creditos', 'num_debitos', 'num_creditos',
+    ))
+    return Response({'success': True, 'card': card_id, 'count': len(data), 'data': data})
+
+
+def _month_param(value):
+    return datetime.strptime(value, '%Y-%m').date() if value else None
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def user_spending_analytics(request, user_id):
+    """
+    Gasto mensual del usuario por tipo de transacción (tabla
+    user_monthly_spending más las transacciones aún no agregadas).
+    Query params opcionales: desde / hasta (YYYY-MM, inclusivos).
+    """
+    get_object_or_404(User.objects.only('id'), id=user_id)
+    try:
+        desde = _month_param(request.query_params.get('desde'))
+        hasta = _month_param(request.query_params.get('hasta'))
+    except ValueError:
+        return Response({'error': 'Meses en formato YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = monthly_spending(user_id, desde, hasta)
+    return Response({'success': True, 'user': user_id, 'count': len(data), 'data': data})
+
 """
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -101,7 +101,23 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLITE_PATH permite usar otra base (p. ej. una copia para benchmarks)
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        # Con varios workers de gunicorn escribiendo a la vez, esperar el lock
+        # de escritura en vez de fallar con "database is locked". BEGIN
+        # IMMEDIATE toma ese lock al abrir cada atomic(): una transacción que
+        # lee y luego escribe (select_for_update no hace nada en SQLite) no
+        # tiene que promocionar un lock de lectura, algo que SQLite rechaza
+        # al instante sin respetar el timeout
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Los tests de concurrencia necesitan una base en fichero: la de
+        # memoria compartida usa bloqueos por tabla distintos
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -167,8 +183,13 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
+    'if-none-match',
 ]
 
+# Headers de respuesta visibles para el frontend (GET condicional en financial-data)
+CORS_EXPOSE_HEADERS = ['etag']
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "Bearer": {
@@ -194,4 +215,51 @@ REST_FRAMEWORK = {
 CIENSPAY_BASE_URL = os.environ.get('CIENSPAY_BASE_URL', 'http://localhost:8000')
 CIENSPAY_API_URL = f"{CIENSPAY_BASE_URL}/api"
 
+# Bancos externos: URLs base, pool de conexiones keep-alive y timeouts (segundos)
+BANK_BASE_URLS = {
+    'creditbank': os.environ.get('CREDITBANK_BASE_URL', 'https://core-banking-service-6pup.onrender.com'),
+    'bancobsidiana': os.environ.get('BANCOBSIDIANA_BASE_URL', 'https://bancobsidiana.up.railway.app'),
+    'cienspay': CIENSPAY_API_URL,
+}
+# Prefijos BIN por banco para enrutar pagos sin bank_identifier reconocido
+BANK_BIN_PREFIXES = {
+    'cienspay': ['4651'],
+    'creditbank': [],
+    'bancobsidiana': [],
+}
+BANK_CONNECT_TIMEOUT = float(os.environ.get('BANK_CONNECT_TIMEOUT', '3.05'))
+BANK_READ_TIMEOUT = float(os.environ.get('BANK_READ_TIMEOUT', '10'))
+BANK_POOL_SIZE = int(os.environ.get('BANK_POOL_SIZE', '10'))
+
+# Outbox de liquidaciones externas (manage.py process_settlements)
+SETTLEMENT_MAX_ATTEMPTS = int(os.environ.get('SETTLEMENT_MAX_ATTEMPTS', '8'))
+SETTLEMENT_RETRY_BASE_SECONDS = float(os.environ.get('SETTLEMENT_RETRY_BASE_SECONDS', '5'))
+SETTLEMENT_LEASE_SECONDS = int(os.environ.get('SETTLEMENT_LEASE_SECONDS', '120'))
+
+# Número de sub-cuentas en las que se reparten los abonos a la tarjeta comercio
+MERCHANT_LEDGER_SHARDS = int(os.environ.get('MERCHANT_LEDGER_SHARDS', '16'))
+
+# Caché en proceso de metadatos de tarjeta (api/card/cache.py)
+CARD_CACHE_SIZE = int(os.environ.get('CARD_CACHE_SIZE', '10000'))
+CARD_CACHE_TTL = float(os.environ.get('CARD_CACHE_TTL', '30'))
+
+# Números de tarjeta libres que se mantienen pre-generados (api/card/numbers.py)
+CARD_POOL_SIZE = int(os.environ.get('CARD_POOL_SIZE', '1000'))
+
+# Máximo de tarjetas por petición en /api/cards/generate/bulk/
+BULK_CARD_ISSUE_MAX = int(os.environ.get('BULK_CARD_ISSUE_MAX', '10000'))
+
+# Tiempo de vida (segundos) de las respuestas guardadas por Idempotency-Key
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+# Segundos tras los que una reserva aún sin respuesta se da por abandonada
+# (worker muerto a mitad de petición); debe superar la petición más lenta
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '60'))
+
+# Máximo de pagos aceptados por petición en /api/transactions/simulate/batch/
+BATCH_PAYMENT_MAX_ITEMS = int(os.environ.get('BATCH_PAYMENT_MAX_ITEMS', '500'))
+
+# Segundos que se guarda en caché la respuesta de financial-data bajo su ETag (0 = sin caché)
+FINANCIAL_DATA_CACHE_TTL = int(os.environ.get('FINANCIAL_DATA_CACHE_TTL', '30'))
 
+# Antigüedad (días) a partir de la cual `archive_transactions` mueve transacciones al archivo
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
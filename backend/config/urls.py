@@ -26,8 +26,8 @@ from django.urls import path
 from django.http import JsonResponse  # Agrega esta línea
 from api.users.view import user_list, login_view, me_view, usuarios_list_all
 ##from api.transaction.view import transaction_list
-from api.transaction.view import TransactionListAPIView, UserCardsTransactionsAPIView, SimulatePaymentAPIView
-from api.card.views import generate_card, list_cards, get_user_cards, toggle_card_status, update_card_balance
+from api.transaction.view import TransactionListAPIView, UserCardsTransactionsAPIView, SimulatePaymentAPIView, BatchPaymentAPIView, payment_metrics, export_transactions, card_daily_balances, TransactionSearchAPIView, user_spending_analytics
+from api.card.views import generate_card, generate_cards_bulk, list_cards, get_user_cards, toggle_card_status, update_card_balance
 
 
 """from api.views import (
@@ -104,14 +104,19 @@ urlpatterns = [
     # all transactions
     path('api/transactions/transaction_list/', TransactionListAPIView.as_view(), name='transaction_list'),
     path('api/transactions/simulate/', SimulatePaymentAPIView.as_view(), name='simulate-payment'),
+    path('api/transactions/export/', export_transactions, name='transaction-export'),
+    path('api/transactions/search/', TransactionSearchAPIView.as_view(), name='transaction-search'),
+    path('api/transactions/simulate/batch/', BatchPaymentAPIView.as_view(), name='simulate-payment-batch'),
 
 
     # Card Management
     path('api/cards/generate/', generate_card, name='generate-card'),
+    path('api/cards/generate/bulk/', generate_cards_bulk, name='generate-cards-bulk'),
     path('api/cards/', list_cards, name='list-cards'),
     path('api/cards/user/<int:user_id>/', get_user_cards, name='get-user-cards'),
     path('api/cards/<int:card_id>/toggle/', toggle_card_status, name='toggle-card-status'),
     path('api/cards/<int:card_id>/balance/', update_card_balance, name='update-card-balance'),
+    path('api/cards/<int:card_id>/daily-balances/', card_daily_balances, name='card-daily-balances'),
 
     # Swagger Documentation
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -120,5 +125,7 @@ urlpatterns = [
     path("api/admin/users-cards/", admin_users_cards, name="admin-users-cards"),
     path("api/admin/users-cards/", admin_users_cards, name="admin-users-cards"),
     path("api/admin/users/<int:pk>/", admin_user_detail, name="admin-user-detail"),
+    path("api/admin/metrics/payments/", payment_metrics, name="admin-payment-metrics"),
     path('api/user/<int:user_id>/financial-data/', UserCardsTransactionsAPIView.as_view(), name='user-financial-data'),
+    path('api/user/<int:user_id>/analytics/', user_spending_analytics, name='user-spending-analytics'),
 ]